@@ -1,24 +1,19 @@
 import os, json
 from datetime import datetime, timedelta
-import openai
+from . import providers
 from .db import SessionLocal, Lead, Reminder
 from .twilio_client import place_tts_call
-try:
-    from polly_s3 import synthesize_speech_to_s3
-except Exception:
-    synthesize_speech_to_s3 = None
-try:
-    from gcloud_tts import synthesize_gcloud_tts_to_s3
-except Exception:
-    synthesize_gcloud_tts_to_s3 = None
+from .polly_s3 import synthesize_speech_to_s3
+from .gcloud_tts import synthesize_gcloud_tts_to_s3
+from .calls_api import record_placed_call, STATUS_CALLBACK_URL
+from .dialer import dialer, CallJob, calling_window
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
 def superego_check(message: str):
     prompt = f"Check this outbound insurance reminder for compliance. Remove marketing claims or guarantees. Return JSON like {{'ok': true, 'message': '<cleaned>'}} or {{'ok': false, 'reason': '...'}}\nMessage:\n{message}"
     try:
-        resp = openai.ChatCompletion.create(model=OPENAI_MODEL, messages=[{'role':'user','content':prompt}], max_tokens=200)
+        resp = providers.get("openai").ChatCompletion.create(model=OPENAI_MODEL, messages=[{'role':'user','content':prompt}], max_tokens=200)
         out = resp['choices'][0]['message']['content'].strip()
         parsed = json.loads(out)
         return parsed
@@ -32,7 +27,14 @@ class SchedulerAgent:
         pass
 
     def run(self, lead_id: int, due_date: datetime, days_before: int = 3, custom_message: str = None, prefer_tts: str = 'polly'):
+        # always hand the connection back; the dialer and status flusher share the same pool
         db = SessionLocal()
+        try:
+            return self._run(db, lead_id, due_date, days_before, custom_message, prefer_tts)
+        finally:
+            db.close()
+
+    def _run(self, db, lead_id: int, due_date: datetime, days_before: int, custom_message: str, prefer_tts: str):
         lead = db.query(Lead).filter(Lead.id == lead_id).first()
         if not lead:
             return {'status':'error','reason':'lead_not_found'}
@@ -50,26 +52,32 @@ class SchedulerAgent:
         # choose TTS provider
         play_url = None
         provider_used = None
-        if prefer_tts == 'polly' and synthesize_speech_to_s3:
+        if prefer_tts == 'polly' and providers.available('polly'):
             try:
                 play_url = synthesize_speech_to_s3(cleaned)
                 provider_used = 'polly'
             except Exception as e:
                 play_url = None
-        if (not play_url) and prefer_tts in ('polly','gcloud') and synthesize_gcloud_tts_to_s3:
+        if (not play_url) and prefer_tts in ('polly','gcloud') and providers.available('gcloud_tts'):
             try:
                 play_url = synthesize_gcloud_tts_to_s3(cleaned)
                 provider_used = 'gcloud'
             except Exception as e:
                 play_url = None
+        # hand off to the rate-shaped dialer when it is running (API process); call inline otherwise
+        if dialer.running:
+            dialer.submit(CallJob(to=lead.phone, message=None if play_url else cleaned, play_url=play_url,
+                                  reminder_id=r.id, lead_id=lead.id, window=calling_window(db, lead.id)))
+            return {'status':'queued','reminder_id':r.id,'provider':provider_used,'played_url':play_url}
         # fallback to Twilio Say
         sid = None
         try:
             if play_url:
-                sid = place_tts_call(lead.phone, play_url=play_url)
+                call = place_tts_call(lead.phone, play_url=play_url, status_callback=STATUS_CALLBACK_URL)
             else:
-                sid = place_tts_call(lead.phone, message=cleaned)
-            r.sent = True; db.commit()
+                call = place_tts_call(lead.phone, message=cleaned, status_callback=STATUS_CALLBACK_URL)
+            # reminder is marked sent by the status webhook once the call completes
+            sid = record_placed_call(db, call, r, lead.phone, play_url=play_url); db.commit()
             return {'status':'called','call_sid':sid,'provider':provider_used,'played_url':play_url}
         except Exception as e:
             return {'status':'failed','error':str(e)}
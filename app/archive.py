@@ -0,0 +1,144 @@
+# app/archive.py
+"""
+Hot/cold split for reminders.
+
+Reminders whose due date is older than ARCHIVE_RETENTION_DAYS are sent or
+expired and no longer needed by listing, dispatch or the dashboard. They are
+moved to `reminders_archive` in small batches (one short transaction each;
+safe to run from several workers, each batch is claimed by its delete),
+with the message text zlib-compressed against a dictionary of our own
+message templates. The archive is only read through GET /reminders/history.
+
+  python -m app.archive --retention-days 30 --batch-size 5000
+"""
+import argparse, asyncio, os, zlib
+from datetime import datetime, timedelta
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from .db import SessionLocal, Reminder, ReminderArchive, Call, DeferredCall, count_reminder_change
+
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))  # 0 disables the in-app job
+
+# Preset dictionary: the phrases our generated reminder messages are made of. Changing it
+# would make existing rows unreadable, so bump the format byte and keep the old one instead.
+_ZDICT_V1 = (b"Premium due for Hello . Reminder: your premium for policy your policy is due on "
+             b"Please contact your agent to pay. This is a reminder that your premium is due soon.")
+_FORMAT_V1 = b"\x01"
+
+
+def compact(text: str) -> bytes:
+    c = zlib.compressobj(level=9, zdict=_ZDICT_V1)
+    return _FORMAT_V1 + c.compress(text.encode()) + c.flush()
+
+
+def expand(blob: bytes) -> str:
+    if blob[:1] != _FORMAT_V1:
+        raise ValueError("unknown archive message format")
+    d = zlib.decompressobj(zdict=_ZDICT_V1)
+    return (d.decompress(blob[1:]) + d.flush()).decode()
+
+
+def archive_reminders(retention_days: int = ARCHIVE_RETENTION_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+                      now: datetime = None, max_batches: int = None) -> dict:
+    """Move reminders due before now - retention_days into the archive; returns counts."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    moved = batches = raw_bytes = stored_bytes = 0
+    # one pass per sent state so each batch is a range scan on ix_reminders_sent_due_date
+    for state in (True, False, None):
+        while max_batches is None or batches < max_batches:
+            db = SessionLocal()
+            try:
+                q = db.query(Reminder.id, Reminder.lead_id, Reminder.due_date, Reminder.message, Reminder.sent)
+                q = q.filter(Reminder.sent.is_(None)) if state is None else q.filter(Reminder.sent == state)
+                # SKIP LOCKED (Postgres) keeps concurrent archivers on different batches
+                rows = q.filter(Reminder.due_date < cutoff).order_by(Reminder.due_date).limit(batch_size) \
+                    .with_for_update(skip_locked=True).all()
+                if not rows:
+                    break
+                ids = [r.id for r in rows]
+                # delete before copying: a worker whose delete comes up short lost the race for this batch
+                if db.query(Reminder).filter(Reminder.id.in_(ids)).delete(synchronize_session=False) != len(ids):
+                    db.rollback()
+                    continue
+                archived_at = datetime.utcnow()
+                payload = []
+                for r in rows:
+                    z = compact(r.message or "")
+                    raw_bytes += len((r.message or "").encode())
+                    stored_bytes += len(z)
+                    payload.append({"reminder_id": r.id, "lead_id": r.lead_id, "due_date": r.due_date, "message_z": z,
+                                    "sent": r.sent, "archived_at": archived_at})
+                db.execute(insert(ReminderArchive.__table__), payload)
+                # keep the call history but detach it: a reused id must not inherit attempts or retries
+                db.query(Call).filter(Call.reminder_id.in_(ids)) \
+                    .update({Call.reminder_id: None, Call.retry_at: None}, synchronize_session=False)
+                db.query(DeferredCall).filter(DeferredCall.reminder_id.in_(ids)).delete(synchronize_session=False)
+                n_sent = sum(1 for r in rows if r.sent)
+                count_reminder_change(db, sent=-n_sent, unsent=n_sent - len(rows))
+                db.commit()
+                moved += len(rows)
+                batches += 1
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+    return {"archived": moved, "batches": batches, "cutoff": cutoff.isoformat(),
+            "message_bytes": raw_bytes, "stored_bytes": stored_bytes}
+
+
+def reminder_history(db, lead_id: int = None, skip: int = 0, limit: int = 100) -> list:
+    q = db.query(ReminderArchive)
+    if lead_id is not None:
+        q = q.filter(ReminderArchive.lead_id == lead_id)
+    rows = q.order_by(ReminderArchive.due_date.desc()).offset(skip).limit(limit).all()
+    return [{"id": r.reminder_id, "lead_id": r.lead_id, "due_date": r.due_date.isoformat(), "message": expand(r.message_z),
+             "sent": r.sent, "archived_at": r.archived_at.isoformat()} for r in rows]
+
+
+_task = None
+
+
+async def _archive_loop():
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL)
+        try:
+            res = await run_in_threadpool(archive_reminders)
+            if res["archived"]:
+                print("archived reminders:", res)
+        except Exception as e:
+            print("reminder archival failed:", e)
+
+
+def start_archiver():
+    global _task
+    if ARCHIVE_INTERVAL > 0 and _task is None:
+        _task = asyncio.get_running_loop().create_task(_archive_loop())
+
+
+async def stop_archiver():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Move old reminders into reminders_archive")
+    p.add_argument("--retention-days", type=int, default=ARCHIVE_RETENTION_DAYS)
+    p.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    p.add_argument("--max-batches", type=int, default=None)
+    args = p.parse_args(argv)
+    from .db import init_db
+    init_db()
+    print(archive_reminders(args.retention_days, args.batch_size, max_batches=args.max_batches))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# app/calls_api.py
+"""
+Twilio call-status webhook.
+
+Callbacks are verified, coalesced per call SID in memory and written to the
+`calls` table in batches (one SELECT + one commit per flush), so a burst of
+callbacks costs a dict insert each instead of a DB round trip each.
+"""
+import asyncio, base64, hashlib, hmac, os, threading
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl
+from fastapi import APIRouter, Request, Response, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_
+from .db import SessionLocal, Call, Reminder, count_reminder_change
+
+router = APIRouter(prefix="/twilio")
+
+TW_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+STATUS_CALLBACK_URL = os.getenv("TWILIO_STATUS_CALLBACK_URL")
+VALIDATE_SIGNATURE = os.getenv("TWILIO_VALIDATE_SIGNATURE", "1") != "0"
+FLUSH_INTERVAL = float(os.getenv("CALL_STATUS_FLUSH_INTERVAL", "1.0"))
+FLUSH_BATCH = int(os.getenv("CALL_STATUS_FLUSH_BATCH", "500"))
+CALL_MAX_ATTEMPTS = int(os.getenv("CALL_MAX_ATTEMPTS", "3"))
+CALL_RETRY_BACKOFF = int(os.getenv("CALL_RETRY_BACKOFF_SECONDS", "900"))
+
+# Twilio may deliver callbacks out of order; a status never moves to a lower rank
+STATUS_RANK = {"queued": 0, "initiated": 1, "ringing": 2, "in-progress": 3,
+               "completed": 4, "busy": 4, "no-answer": 4, "failed": 4, "canceled": 4}
+TERMINAL = {"completed", "busy", "no-answer", "failed", "canceled"}
+RETRY_STATUSES = {"busy", "no-answer", "failed"}
+
+
+def twilio_signature(token: str, url: str, params: list) -> str:
+    data = url + "".join(k + v for k, v in sorted(params))
+    return base64.b64encode(hmac.new(token.encode(), data.encode(), hashlib.sha1).digest()).decode()
+
+
+def _newer(event: dict, current: dict) -> bool:
+    return STATUS_RANK.get(event["status"], 0) >= STATUS_RANK.get(current["status"], 0)
+
+
+class StatusBuffer:
+    def __init__(self, batch: int = FLUSH_BATCH):
+        self.batch = batch
+        self._events = {}
+        self._lock = threading.Lock()
+        self._wake = None
+
+    def add(self, event: dict):
+        with self._lock:
+            current = self._events.get(event["call_sid"])
+            if current is None or _newer(event, current):
+                self._events[event["call_sid"]] = event
+            full = len(self._events) >= self.batch
+        if full and self._wake is not None:
+            self._wake.set()
+
+    def drain(self) -> dict:
+        with self._lock:
+            events, self._events = self._events, {}
+        return events
+
+    def restore(self, events: dict):
+        """Put back events whose write failed, without clobbering newer ones."""
+        for ev in events.values():
+            self.add(ev)
+
+    def __len__(self):
+        return len(self._events)
+
+
+def write_batch(events: dict, now: datetime = None) -> int:
+    """Upsert a batch of coalesced status events keyed by call SID in one transaction."""
+    if not events:
+        return 0
+    now = now or datetime.utcnow()
+    db = SessionLocal()
+    try:
+        existing = {c.call_sid: c for c in db.query(Call).filter(Call.call_sid.in_(list(events.keys()))).all()}
+        new_rows = []
+        completed, retry = [], []
+        for sid, ev in events.items():
+            call = existing.get(sid)
+            if call is None:
+                call = Call(call_sid=sid, to_phone=ev.get("to"), status=ev["status"], duration=ev.get("duration"),
+                            attempt=1, created_at=now, updated_at=now)
+                new_rows.append(call)
+                continue
+            # terminal states are final, so redelivered callbacks cannot queue a second retry
+            if call.status in TERMINAL or STATUS_RANK.get(ev["status"], 0) < STATUS_RANK.get(call.status, 0):
+                continue
+            call.status = ev["status"]
+            if ev.get("duration") is not None:
+                call.duration = ev["duration"]
+            call.updated_at = now
+            if call.reminder_id is None:
+                continue
+            if ev["status"] == "completed":
+                completed.append(call.reminder_id)
+            elif ev["status"] in RETRY_STATUSES and call.attempt < CALL_MAX_ATTEMPTS:
+                call.retry_at = now + timedelta(seconds=CALL_RETRY_BACKOFF * call.attempt)
+                retry.append(call.reminder_id)
+        if new_rows:
+            db.add_all(new_rows)
+        # only touch reminders whose state actually flips, so rowcount is the reminder_counts delta
+        if completed:
+            n = db.query(Reminder).filter(Reminder.id.in_(completed), or_(Reminder.sent == False, Reminder.sent.is_(None))) \
+                .update({Reminder.sent: True}, synchronize_session=False)
+            count_reminder_change(db, sent=n, unsent=-n)
+        if retry:
+            n = db.query(Reminder).filter(Reminder.id.in_(retry), Reminder.sent == True) \
+                .update({Reminder.sent: False}, synchronize_session=False)
+            count_reminder_change(db, sent=-n, unsent=n)
+        db.commit()
+        return len(events)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def record_placed_call(db, call, reminder, to_phone: str, play_url: str = None):
+    """
+    Track a call right after calls.create. With a status callback configured the
+    reminder is only marked sent once Twilio reports the call completed; without
+    one we keep the old behaviour and mark it sent immediately. `play_url` is
+    kept on the row so a retry plays the same audio.
+    """
+    sid = getattr(call, "sid", None) or str(call)
+    prev = db.query(Call).filter(Call.reminder_id == reminder.id).order_by(Call.attempt.desc()).first()
+    attempt = (prev.attempt + 1) if prev else 1
+    if prev is not None:
+        prev.retry_at = None
+    # a fast callback may already have flushed a row for this SID
+    row = db.query(Call).filter(Call.call_sid == sid).first()
+    if row is None:
+        db.add(Call(call_sid=sid, reminder_id=reminder.id, to_phone=to_phone, status="queued", attempt=attempt,
+                    play_url=play_url))
+    else:
+        # write_batch skipped the reminder side effects for it (no reminder_id yet), so apply them here
+        row.reminder_id, row.attempt, row.play_url = reminder.id, attempt, play_url
+        if row.status == "completed":
+            reminder.sent = True
+        elif row.status in RETRY_STATUSES and attempt < CALL_MAX_ATTEMPTS:
+            row.retry_at = datetime.utcnow() + timedelta(seconds=CALL_RETRY_BACKOFF * attempt)
+    if not STATUS_CALLBACK_URL:
+        reminder.sent = True
+    return sid
+
+
+def claim_due_retries(db, now: datetime = None, limit: int = 100) -> list:
+    """Calls whose retry is due; clears retry_at so each retry is handed out once, across workers too."""
+    now = now or datetime.utcnow()
+    calls = db.query(Call).filter(Call.retry_at != None, Call.retry_at <= now).order_by(Call.retry_at).limit(limit).all()
+    claimed = []
+    for c in calls:
+        # conditional update: only the worker that actually clears retry_at gets the call
+        n = db.query(Call).filter(Call.id == c.id, Call.retry_at != None) \
+            .update({Call.retry_at: None}, synchronize_session=False)
+        if n == 1:
+            claimed.append(c)
+    db.commit()
+    return claimed
+
+
+buffer = StatusBuffer()
+_flusher = None
+
+
+async def flush():
+    events = buffer.drain()
+    if not events:
+        return 0
+    try:
+        return await run_in_threadpool(write_batch, events)
+    except Exception as e:
+        buffer.restore(events)
+        print("call status flush failed, will retry:", e)
+        return 0
+
+
+async def _flush_loop():
+    while True:
+        try:
+            await asyncio.wait_for(buffer._wake.wait(), timeout=FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        buffer._wake.clear()
+        await flush()
+
+
+def start_flusher():
+    global _flusher
+    if _flusher is None:
+        buffer._wake = asyncio.Event()
+        _flusher = asyncio.get_running_loop().create_task(_flush_loop())
+
+
+async def stop_flusher():
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        try:
+            await _flusher
+        except asyncio.CancelledError:
+            pass
+        _flusher = None
+    buffer._wake = None
+    await flush()
+
+
+@router.post("/status")
+async def call_status(request: Request):
+    body = (await request.body()).decode()
+    params = parse_qsl(body, keep_blank_values=True)
+    if VALIDATE_SIGNATURE:
+        if not TW_TOKEN:
+            raise HTTPException(status_code=403, detail="TWILIO_AUTH_TOKEN not configured")
+        url = STATUS_CALLBACK_URL or str(request.url)
+        expected = twilio_signature(TW_TOKEN, url, params)
+        if not hmac.compare_digest(expected, request.headers.get("X-Twilio-Signature", "")):
+            raise HTTPException(status_code=403, detail="Invalid Twilio signature")
+    form = dict(params)
+    if not form.get("CallSid") or not form.get("CallStatus"):
+        raise HTTPException(status_code=400, detail="CallSid and CallStatus are required")
+    duration = form.get("CallDuration")
+    buffer.add({"call_sid": form["CallSid"], "status": form["CallStatus"], "to": form.get("To"),
+                "duration": int(duration) if duration and duration.isdigit() else None})
+    return Response(status_code=204)
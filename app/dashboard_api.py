@@ -0,0 +1,89 @@
+# app/dashboard_api.py
+"""
+Aggregates for the dashboard overview, computed in SQL so the client never
+has to pull raw reminder rows. Reminder totals come from db.ReminderCount,
+the due-window counts are range scans on ix_reminders_sent_due_date, and
+the whole summary is memoised per table version (see db.TableVersion) for
+SUMMARY_TTL seconds.
+"""
+import os, threading, time
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Request, Response
+from sqlalchemy import func, or_
+from .db import SessionLocal, Lead, Reminder, Call, table_version, reminder_counts
+from .http_cache import not_modified, not_modified_response, set_cache_headers
+
+router = APIRouter(prefix="/dashboard")
+
+SUMMARY_TTL = float(os.getenv("DASHBOARD_SUMMARY_TTL", "30"))
+# "overdue" looks back this far; older reminders are archived anyway (ARCHIVE_RETENTION_DAYS)
+OVERDUE_DAYS = int(os.getenv("DASHBOARD_OVERDUE_DAYS", os.getenv("ARCHIVE_RETENTION_DAYS", "30")))
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def compute_summary(db, now: datetime = None, days: int = 14) -> dict:
+    now = now or datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    leads_total = db.query(func.count(Lead.id)).scalar() or 0
+
+    # maintained on write (db.ReminderCount); a GROUP BY here is a full scan that grows with the table
+    counts = reminder_counts(db)
+    sent, unsent = counts.get("sent", 0), counts.get("unsent", 0)
+
+    # only unsent reminders are "due" (NULL counts as unsent, as in reminder_counts);
+    # each bucket is a bounded range count on (sent, due_date)
+    def unsent_between(start, end) -> int:
+        return db.query(func.count(Reminder.id)).filter(or_(Reminder.sent == False, Reminder.sent.is_(None)),
+                                                        Reminder.due_date >= start,
+                                                        Reminder.due_date < end).scalar() or 0
+    due = (unsent_between(today, today + timedelta(days=1)),
+           unsent_between(now, now + timedelta(days=7)),
+           unsent_between(now - timedelta(days=OVERDUE_DAYS), now))
+
+    since = today - timedelta(days=days - 1)
+    day = func.date(Call.created_at)
+    rows = db.query(day, Call.status, func.count(Call.id)).filter(Call.created_at >= since) \
+        .group_by(day, Call.status).order_by(day).all()
+    calls_by_day = {}
+    for d, status, count in rows:
+        calls_by_day.setdefault(str(d), {})[status] = count
+
+    return {
+        "generated_at": now.isoformat(),
+        "leads_total": leads_total,
+        "reminders": {"total": sent + unsent, "sent": sent, "unsent": unsent},
+        "due": {"today": due[0], "next_7_days": due[1], "overdue": due[2], "overdue_window_days": OVERDUE_DAYS},
+        "calls_by_day": [{"day": d, **counts} for d, counts in calls_by_day.items()],
+    }
+
+
+@router.get("/summary", response_model=dict)
+def dashboard_summary(request: Request, response: Response, days: int = 14):
+    days = max(1, min(days, 90))
+    db = SessionLocal()
+    try:
+        versions = tuple(table_version(db, t) for t in ("leads", "reminders", "calls"))
+        # due/overdue buckets move with the clock, so the tag also rolls over every minute
+        minute = datetime.utcnow().strftime("%Y%m%d%H%M")
+        etag = f'W/"summary-{"-".join(map(str, versions))}-{minute}-d{days}"'
+        if not_modified(request, etag):
+            return not_modified_response(etag)
+        key = (versions, days)
+        with _memo_lock:
+            hit = _memo.get(key)
+        if hit and time.monotonic() - hit[0] < SUMMARY_TTL:
+            out = hit[1]
+        else:
+            out = compute_summary(db, days=days)
+            with _memo_lock:
+                # drop entries for older versions only, so ?days= variants do not evict each other
+                for k in [k for k in _memo if k[0] != versions]:
+                    del _memo[k]
+                _memo[key] = (time.monotonic(), out)
+    finally:
+        db.close()
+    set_cache_headers(response, etag)
+    return out
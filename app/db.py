@@ -1,7 +1,9 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean
+from datetime import datetime
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, DateTime, Text, Boolean, LargeBinary, Index, event, update, select, insert, func
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, attributes
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
 engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
@@ -24,6 +26,227 @@ class Reminder(Base):
     due_date = Column(DateTime, nullable=False)
     message = Column(Text, nullable=False)
     sent = Column(Boolean, default=False)
+    # due-window counts on the dashboard are range scans on this index; AUTOINCREMENT stops sqlite
+    # from handing an archived reminder's id to a new one (tables created before this keep plain rowids)
+    __table_args__ = (Index("ix_reminders_sent_due_date", "sent", "due_date"), {"sqlite_autoincrement": True})
+
+class ReminderArchive(Base):
+    """Cold storage for old reminders (see app/archive.py); message is zlib-compacted."""
+    __tablename__ = "reminders_archive"
+    id = Column(Integer, primary_key=True)
+    # own key: sqlite may hand a deleted reminders.id out again
+    reminder_id = Column(Integer, nullable=False, index=True)
+    lead_id = Column(Integer, nullable=False, index=True)
+    due_date = Column(DateTime, nullable=False, index=True)
+    message_z = Column(LargeBinary, nullable=False)
+    sent = Column(Boolean, nullable=True)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class Call(Base):
+    """One outbound call attempt, keyed by Twilio call SID; status comes from the status-callback webhook."""
+    __tablename__ = "calls"
+    id = Column(Integer, primary_key=True, index=True)
+    call_sid = Column(String, nullable=False, unique=True, index=True)
+    reminder_id = Column(Integer, nullable=True, index=True)
+    to_phone = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="queued")
+    duration = Column(Integer, nullable=True)
+    attempt = Column(Integer, nullable=False, default=1)
+    play_url = Column(String, nullable=True)  # TTS audio the call played, so a retry plays the same audio
+    retry_at = Column(DateTime, nullable=True, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    __table_args__ = (Index("ix_calls_created_at_status", "created_at", "status"),)
+
+class CallWindow(Base):
+    """Per-lead calling hours (local wall-clock in `timezone`); leads without a row use CALLING_HOURS."""
+    __tablename__ = "call_windows"
+    lead_id = Column(Integer, primary_key=True)
+    timezone = Column(String, nullable=False, default="UTC")
+    start = Column(String, nullable=False, default="09:00")
+    end = Column(String, nullable=False, default="20:00")
+
+class DeferredCall(Base):
+    """A dialer job parked until the lead's calling hours open; re-submitted by the dialer's poller."""
+    __tablename__ = "deferred_calls"
+    id = Column(Integer, primary_key=True)
+    reminder_id = Column(Integer, nullable=False, index=True)
+    lead_id = Column(Integer, nullable=True)
+    to_phone = Column(String, nullable=False)
+    message = Column(Text, nullable=True)
+    play_url = Column(String, nullable=True)
+    run_at = Column(DateTime, nullable=False, index=True)
+
+class TableVersion(Base):
+    """Write counter per table; list endpoints derive their ETag from it."""
+    __tablename__ = "table_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class ReminderCount(Base):
+    """Running count of reminders per sent state ("sent"/"unsent"), so the dashboard never counts the table."""
+    __tablename__ = "reminder_counts"
+    state = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class IdempotencyKey(Base):
+    """Claimed Idempotency-Key per endpoint scope and the stored response (see app/idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+    scope = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    state = Column(String, nullable=False, default="in_progress")
+    status_code = Column(Integer, nullable=True)
+    response = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+VERSIONED_TABLES = ("leads", "reminders", "calls")
+
+def bump_version(conn, *names):
+    for name in names:
+        conn.execute(update(TableVersion.__table__).where(TableVersion.__table__.c.name == name)
+                     .values(version=TableVersion.__table__.c.version + 1))
+
+def table_version(db, name: str) -> int:
+    return db.execute(select(TableVersion.version).where(TableVersion.name == name)).scalar() or 0
+
+def _sent_state(sent) -> str:
+    return "sent" if sent else "unsent"  # NULL counts as unsent, as on the dashboard
+
+def count_reminder_change(session, sent: int = 0, unsent: int = 0):
+    """Record reminder count deltas for writes the flush hook cannot see (Core inserts, bulk update/delete)."""
+    deltas = session.info.setdefault("reminder_deltas", {})
+    deltas["sent"] = deltas.get("sent", 0) + sent
+    deltas["unsent"] = deltas.get("unsent", 0) + unsent
+
+def reminder_counts(db) -> dict:
+    return {state: count for state, count in db.execute(select(ReminderCount.state, ReminderCount.count))}
+
+def recount_reminders(conn):
+    """Rebuild reminder_counts from a full scan (first start, or to repair drift after manual SQL)."""
+    counts = {"sent": 0, "unsent": 0}
+    for sent, n in conn.execute(select(Reminder.sent, func.count()).group_by(Reminder.sent)):
+        counts[_sent_state(sent)] += n
+    t = ReminderCount.__table__
+    for state, n in counts.items():
+        if conn.execute(update(t).where(t.c.state == state).values(count=n)).rowcount == 0:
+            conn.execute(insert(t).values(state=state, count=n))
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_touched(session, flush_context):
+    touched = {o.__table__.name for o in (*session.new, *session.dirty, *session.deleted) if hasattr(o, "__table__")}
+    if touched & set(VERSIONED_TABLES):
+        session.info.setdefault("versions_touched", set()).update(touched & set(VERSIONED_TABLES))
+    if "reminders" not in touched:
+        return
+    sent = unsent = 0
+    for o in session.new:
+        if isinstance(o, Reminder):
+            sent, unsent = (sent + 1, unsent) if o.sent else (sent, unsent + 1)
+    for o in session.deleted:
+        if isinstance(o, Reminder):
+            # the row is gone, so read the loaded value rather than trigger a refresh
+            sent, unsent = (sent - 1, unsent) if o.__dict__.get("sent") else (sent, unsent - 1)
+    for o in session.dirty:
+        if isinstance(o, Reminder):
+            h = attributes.get_history(o, "sent")
+            if h.added and h.deleted and _sent_state(h.added[0]) != _sent_state(h.deleted[0]):
+                d = 1 if h.added[0] else -1
+                sent, unsent = sent + d, unsent - d
+    if sent or unsent:
+        count_reminder_change(session, sent, unsent)
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _collect_bulk(state):
+    # query(...).update()/.delete() bypass the flush
+    if (state.is_update or state.is_delete) and state.bind_mapper is not None:
+        name = state.bind_mapper.local_table.name
+        if name in VERSIONED_TABLES:
+            state.session.info.setdefault("versions_touched", set()).add(name)
+
+@event.listens_for(SessionLocal, "before_commit")
+def _bump_on_commit(session):
+    # bumped in the same transaction as the write, so the version never runs ahead of the data,
+    # but only at commit: the table_versions row lock is then held for the commit alone, not for
+    # everything after the first flush (bulk_upload flushes at row 1 and commits at the end)
+    session.flush()
+    touched = session.info.pop("versions_touched", None)
+    if touched:
+        bump_version(session.connection(), *sorted(touched))
+    deltas = session.info.pop("reminder_deltas", None)
+    t = ReminderCount.__table__
+    for state, d in sorted((deltas or {}).items()):
+        if d:
+            session.connection().execute(update(t).where(t.c.state == state).values(count=t.c.count + d))
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _reset_touched(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("versions_touched", None)
+        session.info.pop("reminder_deltas", None)
+
+# columns added to existing tables after their first release: create_all never alters a table
+ADDED_COLUMNS = ((Call.__table__, "play_url"),)
+
+
+def add_missing_columns():
+    for table, name in ADDED_COLUMNS:
+        if name in {c["name"] for c in inspect(engine).get_columns(table.name)}:
+            continue
+        col = table.c[name]
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}"))
+        except (OperationalError, ProgrammingError):
+            pass  # another worker added it first
+
+
+def create_missing_indexes():
+    """
+    Indexes added to existing tables after their first release (create_all builds
+    them for new databases). CREATE INDEX locks the table against writes while it
+    builds, so this runs as a one-off deploy step (python -m app.db), not on import.
+    """
+    created = []
+    for table in (Reminder.__table__, Call.__table__):
+        have = {i["name"] for i in inspect(engine).get_indexes(table.name)}
+        for idx in table.indexes:
+            if idx.name in have:
+                continue
+            try:
+                idx.create(bind=engine)
+                created.append(idx.name)
+            except (OperationalError, ProgrammingError):
+                pass  # another process created it first
+    return created
+
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()  # the ORM selects these columns, so they cannot wait for a deploy step
+    with engine.connect() as conn:
+        have = {r[0] for r in conn.execute(select(TableVersion.name))}
+    for name in VERSIONED_TABLES:
+        if name not in have:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(TableVersion.__table__).values(name=name, version=0))
+            except IntegrityError:
+                pass  # another worker seeded it first
+    with engine.connect() as conn:
+        counted = conn.execute(select(func.count()).select_from(ReminderCount.__table__)).scalar()
+    if not counted:
+        try:
+            with engine.begin() as conn:
+                recount_reminders(conn)
+        except IntegrityError:
+            pass
+
+
+def migrate():
+    init_db()
+    return {"indexes_created": create_missing_indexes()}
+
+
+if __name__ == "__main__":
+    print(migrate())
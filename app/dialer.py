@@ -0,0 +1,418 @@
+# app/dialer.py
+"""
+Async outbound call placement.
+
+Jobs go on an asyncio queue and are placed by a fixed number of workers.
+Each from-number in the pool has its own token bucket (Twilio enforces CPS
+per caller ID), a worker takes whichever number frees up first, and 429/5xx
+responses are retried with full-jitter backoff. Jobs outside the lead's
+calling-hours window are parked in `deferred_calls` until the window opens,
+so a restart does not lose them. Calls queued for retry by the status
+webhook (calls.retry_at) and due deferrals are picked up by a poller.
+
+Token buckets live in the process: each uvicorn worker runs its own dialer
+at TWILIO_CALLS_PER_SECOND per number. Run the API with a single worker, or
+divide the Twilio limit by the number of workers.
+"""
+import asyncio, os, random, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, time as dtime, timezone
+from typing import Optional
+from fastapi import APIRouter
+
+router = APIRouter(prefix="/dialer")
+
+FROM_NUMBERS = [n.strip() for n in os.getenv("TWILIO_FROM_NUMBERS", os.getenv("TWILIO_PHONE_NUMBER") or "").split(",") if n.strip()]
+CALLS_PER_SECOND = float(os.getenv("TWILIO_CALLS_PER_SECOND", "1"))
+CALL_BURST = float(os.getenv("TWILIO_CALL_BURST", "1"))
+DIALER_CONCURRENCY = int(os.getenv("DIALER_CONCURRENCY", "8"))
+DIALER_MAX_RETRIES = int(os.getenv("DIALER_MAX_RETRIES", "5"))
+DIALER_BACKOFF = float(os.getenv("DIALER_BACKOFF_SECONDS", "1.0"))
+DIALER_BACKOFF_MAX = float(os.getenv("DIALER_BACKOFF_MAX_SECONDS", "60"))
+DIALER_RETRY_POLL = float(os.getenv("DIALER_RETRY_POLL_SECONDS", "30"))
+CALLING_HOURS = os.getenv("CALLING_HOURS")  # e.g. "09:00-20:00"; unset means no default restriction
+CALLING_TZ = os.getenv("CALLING_TZ", "UTC")
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until one token is available (0 if available now)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def penalize(self, seconds: float):
+        """Back this number off after a 429 by pushing its bucket into debt."""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+# -------------------------
+# Calling hours
+# -------------------------
+def parse_window(spec: str, tz: str = None) -> tuple:
+    start, end = spec.split("-")
+    return (tz or CALLING_TZ, dtime.fromisoformat(start.strip()), dtime.fromisoformat(end.strip()))
+
+
+def _zone(name: str):
+    from zoneinfo import ZoneInfo
+    return ZoneInfo(name)  # no UTC fallback: a wrong zone would put calls in the middle of the night
+
+
+def _default_window():
+    """CALLING_HOURS/CALLING_TZ, validated at import so a typo stops the app instead of mis-timing calls."""
+    if not CALLING_HOURS:
+        return None
+    try:
+        window = parse_window(CALLING_HOURS)
+        _zone(window[0])
+    except Exception as e:
+        raise ValueError(f"invalid CALLING_HOURS={CALLING_HOURS!r} / CALLING_TZ={CALLING_TZ!r}: {e}") from e
+    return window
+
+
+DEFAULT_WINDOW = _default_window()
+
+
+def seconds_until_allowed(window: tuple, now: datetime = None) -> float:
+    """0 if `now` is inside the (tz, start, end) window, else seconds until it next opens."""
+    if window is None:
+        return 0.0
+    tz, start, end = window
+    if start == end:
+        return 0.0  # e.g. 00:00-00:00: no restriction
+    now = now or datetime.now(timezone.utc)
+    local = now.astimezone(_zone(tz))
+    t = local.time()
+    inside = (start <= t < end) if start <= end else (t >= start or t < end)
+    if inside:
+        return 0.0
+    opens = local.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+    if opens <= local:
+        opens += timedelta(days=1)
+    return (opens - local).total_seconds()
+
+
+def calling_window(db, lead_id: int) -> tuple:
+    """The lead's own calling hours if set, else the CALLING_HOURS/CALLING_TZ default (None: any time)."""
+    from .db import CallWindow
+    w = db.query(CallWindow).filter(CallWindow.lead_id == lead_id).first()
+    if w:
+        try:
+            _zone(w.timezone)
+            return (w.timezone, dtime.fromisoformat(w.start), dtime.fromisoformat(w.end))
+        except Exception as e:
+            # rows stored before the API validated zones; the configured default is safer than UTC
+            print("dialer: ignoring invalid calling hours for lead", lead_id, "-", e)
+    return DEFAULT_WINDOW
+
+
+# -------------------------
+# Engine
+# -------------------------
+@dataclass
+class CallJob:
+    to: str
+    message: Optional[str] = None
+    play_url: Optional[str] = None
+    reminder_id: Optional[int] = None
+    lead_id: Optional[int] = None
+    window: Optional[tuple] = None
+    attempt: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+def _retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status", None)
+    return status == 429 or (isinstance(status, int) and status >= 500)
+
+
+def _default_place(job: CallJob, from_number: str):
+    from .twilio_client import place_tts_call
+    from .calls_api import STATUS_CALLBACK_URL
+    return place_tts_call(job.to, message=job.message, play_url=job.play_url,
+                          from_number=from_number, status_callback=STATUS_CALLBACK_URL)
+
+
+def _default_record(job: CallJob, call):
+    if job.reminder_id is None:
+        return
+    from .db import SessionLocal, Reminder
+    from .calls_api import record_placed_call
+    db = SessionLocal()
+    try:
+        r = db.query(Reminder).filter(Reminder.id == job.reminder_id).first()
+        if r:
+            record_placed_call(db, call, r, job.to, play_url=job.play_url)
+            db.commit()
+    finally:
+        db.close()
+
+
+def _default_defer(job: CallJob, run_at: datetime) -> bool:
+    """Persist a job that has to wait for calling hours; False if it has no reminder to tie it to."""
+    if job.reminder_id is None:
+        return False
+    from .db import SessionLocal, DeferredCall
+    db = SessionLocal()
+    try:
+        db.add(DeferredCall(reminder_id=job.reminder_id, lead_id=job.lead_id, to_phone=job.to, message=job.message,
+                            play_url=job.play_url, run_at=run_at))
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+class Dialer:
+    def __init__(self, from_numbers: list = None, rate: float = CALLS_PER_SECOND, burst: float = CALL_BURST,
+                 concurrency: int = DIALER_CONCURRENCY, max_retries: int = DIALER_MAX_RETRIES,
+                 backoff: float = DIALER_BACKOFF, backoff_max: float = DIALER_BACKOFF_MAX,
+                 place=_default_place, record=_default_record, defer=_default_defer,
+                 retry_poll: float = DIALER_RETRY_POLL):
+        self.from_numbers = list(from_numbers if from_numbers is not None else FROM_NUMBERS) or [None]
+        self.buckets = {n: TokenBucket(rate, burst) for n in self.from_numbers}
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.place = place
+        self.record = record
+        self.defer = defer
+        self.retry_poll = retry_poll
+        self._rng = random.Random()
+        self._loop = None
+        self._queue = None
+        self._tasks = []
+        self._executor = None
+        self._pending = 0
+        self._idle = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.placed = self.failed = self.retried = self.throttled = self.deferred = 0
+        self.per_number = {n: 0 for n in self.from_numbers}
+        self._first_placed = self._last_placed = None
+        self._queue_latency = deque(maxlen=10000)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    # ---- lifecycle
+    async def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="dialer")
+        self._tasks = [self._loop.create_task(self._worker()) for _ in range(self.concurrency)]
+        if self.retry_poll:
+            self._tasks.append(self._loop.create_task(self._retry_poller()))
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        for t in self._tasks:
+            try:
+                await t
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def join(self):
+        """Wait until every submitted job (including scheduled retries) is done."""
+        await self._idle.wait()
+
+    # ---- submission (safe from any thread)
+    def submit(self, job: CallJob):
+        if not self.running:
+            raise RuntimeError("dialer is not running")
+        job.enqueued_at = time.monotonic()
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._enqueue(job)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, job)
+
+    def _enqueue(self, job: CallJob, delay: float = 0.0, new: bool = True):
+        if new:
+            self._pending += 1
+            self._idle.clear()
+        if delay > 0:
+            self._loop.call_later(delay, self._queue.put_nowait, job)
+        else:
+            self._queue.put_nowait(job)
+
+    def _done(self):
+        self._pending -= 1
+        if self._pending == 0:
+            self._idle.set()
+
+    # ---- workers
+    async def _acquire_number(self) -> str:
+        while True:
+            number = min(self.from_numbers, key=lambda n: self.buckets[n].delay())
+            wait = self.buckets[number].delay()
+            if wait <= 0:
+                self.buckets[number].take()
+                return number
+            await asyncio.sleep(wait)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                wait = seconds_until_allowed(job.window)
+                if wait > 0:
+                    self.deferred += 1
+                    run_at = datetime.utcnow() + timedelta(seconds=wait)
+                    try:
+                        parked = await self._loop.run_in_executor(self._executor, self.defer, job, run_at)
+                    except Exception as e:
+                        print("dialer: could not persist deferred call for", job.to, "-", e)
+                        parked = False
+                    if parked:
+                        self._done()  # the poller re-submits it as a new job once run_at passes
+                    else:
+                        self._enqueue(job, delay=wait, new=False)
+                    continue
+                number = await self._acquire_number()
+                self._queue_latency.append(time.monotonic() - job.enqueued_at)
+                try:
+                    call = await self._loop.run_in_executor(self._executor, self.place, job, number)
+                except Exception as e:
+                    if _retryable(e) and job.attempt < self.max_retries:
+                        if getattr(e, "status", None) == 429:
+                            self.throttled += 1
+                            self.buckets[number].penalize(1.0)
+                        self.retried += 1
+                        job.attempt += 1
+                        cap = min(self.backoff_max, self.backoff * (2 ** job.attempt))
+                        self._enqueue(job, delay=self._rng.uniform(0, cap), new=False)
+                        continue
+                    self.failed += 1
+                    print("dialer: giving up on", job.to, "-", e)
+                    self._done()
+                    continue
+                now = time.monotonic()
+                self.placed += 1
+                self.per_number[number] = self.per_number.get(number, 0) + 1
+                self._first_placed = self._first_placed or now
+                self._last_placed = now
+                try:
+                    await self._loop.run_in_executor(self._executor, self.record, job, call)
+                except Exception as e:
+                    print("dialer: could not record call for", job.to, "-", e)
+                self._done()
+            finally:
+                self._queue.task_done()
+
+    async def _retry_poller(self):
+        while True:
+            await asyncio.sleep(self.retry_poll)
+            try:
+                jobs = await self._loop.run_in_executor(self._executor, due_retry_jobs)
+                jobs += await self._loop.run_in_executor(self._executor, due_deferred_jobs)
+            except Exception as e:
+                print("dialer: retry poll failed -", e)
+                continue
+            for job in jobs:
+                self._enqueue(job)
+
+    # ---- reporting
+    def stats(self) -> dict:
+        lat = sorted(self._queue_latency)
+        pct = lambda p: round(lat[min(len(lat) - 1, int(p / 100.0 * len(lat)))] * 1000.0, 2) if lat else 0.0
+        span = (self._last_placed - self._first_placed) if self._first_placed and self._last_placed else 0.0
+        return {
+            "running": self.running,
+            "from_numbers": len(self.from_numbers),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "pending": self._pending,
+            "placed": self.placed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "throttled_429": self.throttled,
+            "deferred_calling_hours": self.deferred,
+            "calls_per_sec": round((self.placed - 1) / span, 2) if span > 0 else 0.0,
+            "queue_latency_ms": {"p50": pct(50), "p95": pct(95), "p99": pct(99)},
+            "per_number": dict(self.per_number),
+        }
+
+
+def due_retry_jobs(limit: int = 500) -> list:
+    """Turn calls whose retry_at is due (set by the status webhook) into CallJobs."""
+    from .db import SessionLocal, Reminder, Lead
+    from .calls_api import claim_due_retries
+    db = SessionLocal()
+    try:
+        jobs = []
+        for call in claim_due_retries(db, limit=limit):
+            r = db.query(Reminder).filter(Reminder.id == call.reminder_id).first()
+            if not r or r.sent:
+                continue
+            lead = db.query(Lead).filter(Lead.id == r.lead_id).first()
+            if not lead:
+                continue
+            # replay the audio the first attempt played; only fall back to <Say> when there was none
+            jobs.append(CallJob(to=lead.phone, message=None if call.play_url else r.message, play_url=call.play_url,
+                                reminder_id=r.id, lead_id=lead.id, window=calling_window(db, lead.id)))
+        return jobs
+    finally:
+        db.close()
+
+
+def due_deferred_jobs(limit: int = 500) -> list:
+    """Claim deferred calls whose calling hours have opened (deleting each row hands it to one process)."""
+    from .db import SessionLocal, DeferredCall, Reminder
+    db = SessionLocal()
+    try:
+        jobs = []
+        rows = db.query(DeferredCall).filter(DeferredCall.run_at <= datetime.utcnow()) \
+            .order_by(DeferredCall.run_at).limit(limit).all()
+        for d in rows:
+            if db.query(DeferredCall).filter(DeferredCall.id == d.id).delete(synchronize_session=False) != 1:
+                continue  # another worker claimed it
+            r = db.query(Reminder).filter(Reminder.id == d.reminder_id).first()
+            if not r or r.sent:
+                continue
+            jobs.append(CallJob(to=d.to_phone, message=d.message, play_url=d.play_url, reminder_id=d.reminder_id,
+                                lead_id=d.lead_id, window=calling_window(db, d.lead_id) if d.lead_id else None))
+        db.commit()
+        return jobs
+    finally:
+        db.close()
+
+
+dialer = Dialer()
+
+
+@router.get("/stats")
+def dialer_stats():
+    return dialer.stats()
@@ -1,6 +1,5 @@
-import os, uuid, boto3
-from google.cloud import texttospeech
-from botocore.exceptions import BotoCoreError, ClientError
+import os, uuid
+from . import providers
 
 GCP_VOICE = os.getenv("GCP_TTS_VOICE", "en-US-Wavenet-D")
 GCP_LANG = os.getenv("GCP_TTS_LANGUAGE_CODE", "en-US")
@@ -9,10 +8,11 @@ AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 S3_BUCKET = os.getenv("AWS_S3_BUCKET")
 
-s3_client = boto3.client("s3", region_name=AWS_REGION, aws_access_key_id=AWS_ACCESS_KEY_ID, aws_secret_access_key=AWS_SECRET_ACCESS_KEY)
+# google.cloud.texttospeech and boto3 are imported on first use by app.providers
 
 def synthesize_gcloud_tts_to_s3(text: str, voice: str = None, filename: str = None, bucket: str = None, fmt: str = "mp3") -> str:
-    client = texttospeech.TextToSpeechClient()
+    texttospeech = providers.module("gcloud_tts")
+    client = providers.get("gcloud_tts")
     synthesis_input = texttospeech.SynthesisInput(text=text)
     voice_config = texttospeech.VoiceSelectionParams(language_code=GCP_LANG, name=voice or GCP_VOICE)
     audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
@@ -23,7 +23,7 @@ def synthesize_gcloud_tts_to_s3(text: str, voice: str = None, filename: str = No
         raise ValueError("S3 bucket name is not configured (AWS_S3_BUCKET).")
     filename = filename or f"gctts_{uuid.uuid4().hex}.{fmt}"
     try:
-        s3_client.put_object(Bucket=bucket, Key=filename, Body=audio_content, ACL='public-read', ContentType='audio/mpeg')
+        providers.get("s3").put_object(Bucket=bucket, Key=filename, Body=audio_content, ACL='public-read', ContentType='audio/mpeg')
     except Exception as e:
         raise RuntimeError(f"S3 upload failed: {e}") from e
     return f"https://{bucket}.s3.{AWS_REGION}.amazonaws.com/{filename}"
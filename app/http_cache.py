@@ -0,0 +1,35 @@
+# app/http_cache.py
+"""
+ETag / conditional GET helpers for the list endpoints.
+
+The ETag is the table's write counter (db.TableVersion) plus the query
+parameters, so answering a revalidation costs one primary-key lookup and
+no row reads.
+"""
+from fastapi import Request, Response
+from .db import table_version
+
+CACHE_CONTROL = "private, no-cache"  # clients may keep a copy but must revalidate
+
+
+def list_etag(db, table: str, **params) -> str:
+    qs = "-".join(f"{k}={params[k]}" for k in sorted(params))
+    return f'W/"{table}-v{table_version(db, table)}-{qs}"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in [t.strip() for t in header.split(",")]
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_cache_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
@@ -0,0 +1,218 @@
+# app/idempotency.py
+"""
+Idempotency keys for endpoints that are expensive to repeat.
+
+A client sends `Idempotency-Key: <anything unique per logical request>` and
+may retry freely: the first request claims the key in `idempotency_keys`
+(one primary-key insert), runs, and stores its response; repeats get that
+response back (with `Idempotent-Replayed: true`) from an in-process LRU or
+the table. A repeat that arrives while the first is still running waits
+for it (IDEMPOTENCY_WAIT_SECONDS) instead of running the work again, then
+gets 409 if it is still not done.
+
+A key reused with a different body is rejected with 422. A request that
+fails (exception/HTTPException) releases its key so a retry runs again.
+Keys expire after IDEMPOTENCY_TTL_SECONDS.
+"""
+import hashlib, json, os, threading, time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from .db import SessionLocal, IdempotencyKey
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+# an in-progress claim older than this is assumed to belong to a crashed worker
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", "300"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1024"))
+MAX_KEY_LENGTH = 255
+_POLL = 0.2
+_PURGE_EVERY = 600.0
+
+_lock = threading.Lock()
+_cache = OrderedDict()   # (scope, key) -> (fingerprint, status_code, body, expires_monotonic)
+_inflight = {}           # (scope, key) -> threading.Event set when the owner finishes
+_last_purge = 0.0
+
+
+def fingerprint(payload) -> str:
+    """sha256 of the request: raw bytes as-is, anything else as canonical JSON."""
+    if not isinstance(payload, (bytes, bytearray)):
+        payload = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _check_key(key: str):
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+
+def _replay(fp: str, entry):
+    if entry[0] != fp:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    return JSONResponse(entry[2], status_code=entry[1], headers={"Idempotent-Replayed": "true"})
+
+
+def _cached(k):
+    with _lock:
+        entry = _cache.get(k)
+        if entry is None:
+            return None
+        if entry[3] < time.monotonic():
+            del _cache[k]
+            return None
+        _cache.move_to_end(k)
+        return entry
+
+
+def _remember(k, fp, status_code, body, ttl_left):
+    with _lock:
+        _cache[k] = (fp, status_code, body, time.monotonic() + ttl_left)
+        _cache.move_to_end(k)
+        while len(_cache) > IDEMPOTENCY_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _purge_expired(db, now):
+    global _last_purge
+    if time.monotonic() - _last_purge < _PURGE_EVERY:
+        return
+    _last_purge = time.monotonic()
+    db.execute(delete(IdempotencyKey.__table__).where(IdempotencyKey.created_at < now - timedelta(seconds=IDEMPOTENCY_TTL)))
+    db.commit()
+
+
+def _claim(k, fp):
+    """Claim the key in the table. Returns None if we own it, else the finished (fp, status, body, expires) entry."""
+    t = IdempotencyKey.__table__
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT
+    db = SessionLocal()
+    try:
+        while True:
+            now = datetime.utcnow()
+            _purge_expired(db, now)
+            try:
+                db.execute(insert(t).values(scope=k[0], key=k[1], fingerprint=fp, state="in_progress", created_at=now))
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+            row = db.execute(select(t).where(t.c.scope == k[0], t.c.key == k[1])).first()
+            if row is None:
+                continue  # released between our insert and select; try again
+            age = (now - row.created_at).total_seconds()
+            if age > IDEMPOTENCY_TTL or (row.state == "in_progress" and age > IDEMPOTENCY_LOCK_TIMEOUT):
+                db.execute(delete(t).where(t.c.scope == k[0], t.c.key == k[1], t.c.created_at == row.created_at))
+                db.commit()
+                continue
+            if row.fingerprint != fp:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+            if row.state == "done":
+                return (row.fingerprint, row.status_code, json.loads(row.response), time.monotonic() + IDEMPOTENCY_TTL - age)
+            # claimed by another worker process: wait for it
+            if time.monotonic() >= deadline:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress",
+                                    headers={"Retry-After": "1"})
+            time.sleep(_POLL)
+    finally:
+        db.close()
+
+
+def _finish(k, fp, status_code, body):
+    body = json.loads(json.dumps(body, default=str))  # replay exactly what a client would have decoded
+    _remember(k, fp, status_code, body, IDEMPOTENCY_TTL)
+    t = IdempotencyKey.__table__
+    db = SessionLocal()
+    try:
+        db.execute(update(t).where(t.c.scope == k[0], t.c.key == k[1])
+                   .values(state="done", status_code=status_code, response=json.dumps(body)))
+        db.commit()
+    except Exception as e:
+        # the work is done; other workers will re-run it once the claim times out
+        print("could not store idempotent response for", k, "-", e)
+    finally:
+        db.close()
+
+
+def _release(k):
+    t = IdempotencyKey.__table__
+    db = SessionLocal()
+    try:
+        db.execute(delete(t).where(t.c.scope == k[0], t.c.key == k[1], t.c.state == "in_progress"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _begin(k, fp):
+    """Sync part of the protocol. Returns (replay_response, None) or (None, event) when we own the key."""
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT
+    while True:
+        entry = _cached(k)
+        if entry is not None:
+            return _replay(fp, entry), None
+        with _lock:
+            ev = _inflight.get(k)
+            if ev is None:
+                ev = _inflight[k] = threading.Event()
+                break
+        # same-process duplicate: wait on the owner rather than the table
+        if not ev.wait(max(0.0, deadline - time.monotonic())):
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress",
+                                headers={"Retry-After": "1"})
+    try:
+        entry = _claim(k, fp)
+    except BaseException:
+        _done(k, ev)
+        raise
+    if entry is not None:
+        _remember(k, *entry[:3], entry[3] - time.monotonic())
+        _done(k, ev)
+        return _replay(fp, entry), None
+    return None, ev
+
+
+def _done(k, ev):
+    with _lock:
+        _inflight.pop(k, None)
+    ev.set()
+
+
+def run(scope: str, key: str, fp: str, handler, status_code: int = 200):
+    """Run the sync `handler()` at most once per (scope, key); its return value must be JSON-serialisable."""
+    _check_key(key)
+    k = (scope, key)
+    replay, ev = _begin(k, fp)
+    if replay is not None:
+        return replay
+    try:
+        body = handler()
+    except BaseException:
+        _release(k)
+        _done(k, ev)
+        raise
+    _finish(k, fp, status_code, body)
+    _done(k, ev)
+    return body
+
+
+async def run_async(scope: str, key: str, fp: str, handler, status_code: int = 200):
+    """`run` for async endpoints: `handler` is awaited on the event loop, table work goes to the threadpool."""
+    _check_key(key)
+    k = (scope, key)
+    replay, ev = await run_in_threadpool(_begin, k, fp)
+    if replay is not None:
+        return replay
+    try:
+        body = await handler()
+    except BaseException:
+        await run_in_threadpool(_release, k)
+        _done(k, ev)
+        raise
+    await run_in_threadpool(_finish, k, fp, status_code, body)
+    _done(k, ev)
+    return body
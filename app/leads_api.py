@@ -1,10 +1,12 @@
 # app/leads_api.py
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import os
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Response, Header
 from pydantic import BaseModel
 from typing import List, Optional
-from .db import SessionLocal, Lead, Reminder
-import pandas as pd
-from datetime import datetime
+from .db import SessionLocal, Lead, Reminder, CallWindow
+from .http_cache import list_etag, not_modified, not_modified_response, set_cache_headers
+from . import idempotency
+from datetime import datetime, time
 
 router = APIRouter(prefix="/leads")
 
@@ -22,6 +24,11 @@ class LeadUpdate(BaseModel):
     policy_id: Optional[str] = None
     notes: Optional[str] = None
 
+class CallingHours(BaseModel):
+    timezone: str = "UTC"
+    start: time
+    end: time
+
 @router.post("/", response_model=dict)
 def create_lead(l: LeadCreate):
     db = SessionLocal()
@@ -30,13 +37,27 @@ def create_lead(l: LeadCreate):
     return {"lead_id": lead.id}
 
 @router.get("/", response_model=List[dict])
-def list_leads(skip: int = 0, limit: int = 100):
+def list_leads(request: Request, response: Response, skip: int = 0, limit: int = 100):
     db = SessionLocal()
+    etag = list_etag(db, "leads", skip=skip, limit=limit)
+    if not_modified(request, etag):
+        db.close()
+        return not_modified_response(etag)
     leads = db.query(Lead).offset(skip).limit(limit).all()
     out = [{"id": r.id, "name": r.name, "phone": r.phone, "email": r.email, "policy_id": r.policy_id, "notes": r.notes} for r in leads]
     db.close()
+    set_cache_headers(response, etag)
     return out
 
+@router.get("/{lead_id}", response_model=dict)
+def get_lead(lead_id: int):
+    db = SessionLocal()
+    r = db.query(Lead).filter(Lead.id == lead_id).first()
+    db.close()
+    if not r:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return {"id": r.id, "name": r.name, "phone": r.phone, "email": r.email, "policy_id": r.policy_id, "notes": r.notes}
+
 @router.put("/{lead_id}", response_model=dict)
 def update_lead(lead_id: int, payload: LeadUpdate):
     db = SessionLocal()
@@ -59,15 +80,41 @@ def delete_lead(lead_id: int):
     db.delete(lead); db.commit(); db.close()
     return {"ok": True}
 
+@router.put("/{lead_id}/calling_hours", response_model=dict)
+def set_calling_hours(lead_id: int, payload: CallingHours):
+    """Local hours during which the dialer may call this lead."""
+    from zoneinfo import ZoneInfo
+    try:
+        ZoneInfo(payload.timezone)
+    except Exception:
+        # the dialer would otherwise fall back to UTC and may call at night local time
+        raise HTTPException(status_code=422, detail=f"Unknown timezone: {payload.timezone}")
+    db = SessionLocal()
+    if not db.query(Lead.id).filter(Lead.id == lead_id).first():
+        db.close()
+        raise HTTPException(status_code=404, detail="Lead not found")
+    w = db.query(CallWindow).filter(CallWindow.lead_id == lead_id).first() or CallWindow(lead_id=lead_id)
+    w.timezone, w.start, w.end = payload.timezone, payload.start.strftime("%H:%M"), payload.end.strftime("%H:%M")
+    db.add(w); db.commit(); db.close()
+    return {"ok": True, "calling_hours": {"lead_id": lead_id, "timezone": payload.timezone, "start": payload.start.strftime("%H:%M"), "end": payload.end.strftime("%H:%M")}}
+
 @router.post("/bulk_upload", response_model=dict)
-async def bulk_upload(file: UploadFile = File(...)):
+async def bulk_upload(file: UploadFile = File(...), idempotency_key: Optional[str] = Header(None)):
     """
     Accept CSV or Excel file with columns:
     name, phone, email (optional), policy_id (optional), notes (optional), due_date (optional ISO)
     If due_date provided, schedule a Reminder row.
+    Retries are safe: without an Idempotency-Key header the file's content hash is the key.
     """
     ext = (file.filename or "").lower()
     contents = await file.read()
+    # the file type decides how (and whether) the bytes are parsed, so it is part of the request
+    fp = idempotency.fingerprint(os.path.splitext(ext)[1].encode() + b"\0" + contents)
+    return await idempotency.run_async("leads.bulk_upload", idempotency_key or f"sha256:{fp}", fp,
+                                       lambda: _bulk_upload(ext, contents))
+
+async def _bulk_upload(ext: str, contents: bytes) -> dict:
+    import pandas as pd  # heavy; only needed here, keep it off the startup path
     try:
         if ext.endswith(".csv"):
             df = pd.read_csv(pd.io.common.BytesIO(contents))
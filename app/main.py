@@ -1,9 +1,10 @@
 # app/main.py
 import os
-from fastapi import FastAPI, UploadFile, BackgroundTasks
+from fastapi import FastAPI, UploadFile, BackgroundTasks, Header
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 from .db import init_db, SessionLocal, Lead
+from . import idempotency
 from .agents import policy_expert_answer, advisor_recommendation, schedule_premium_reminder, send_premium_call
 from apscheduler.schedulers.background import BackgroundScheduler
 
@@ -64,10 +65,19 @@ class ReminderReq(BaseModel):
     due_date: datetime
 
 @app.post("/schedule_reminder")
-def schedule_reminder(req: ReminderReq, background_tasks: BackgroundTasks):
+def schedule_reminder(req: ReminderReq, background_tasks: BackgroundTasks, idempotency_key: str = Header(None)):
     """
     Create reminder and schedule APS job to call at (due_date - days_before).
+    With an Idempotency-Key header a retried request gets the original response back.
     """
+    # note: app.main does not import at the moment (it needs agent helpers that app.agents no longer
+    # provides), so this path is not exercised; main_crewai's /crew/schedule_reminder is the live one
+    if idempotency_key:
+        return idempotency.run("schedule_reminder", idempotency_key, idempotency.fingerprint(req.dict()),
+                               lambda: _schedule_reminder(req))
+    return _schedule_reminder(req)
+
+def _schedule_reminder(req: ReminderReq):
     # build default message
     db = SessionLocal()
     lead = db.query(Lead).filter(Lead.id == req.lead_id).first()
@@ -78,12 +88,13 @@ def schedule_reminder(req: ReminderReq, background_tasks: BackgroundTasks):
     call_time = req.due_date - timedelta(days=req.days_before)
     def job_call(lead_phone=lead.phone, message=default_msg, reminder_id=reminder.id):
         sid = send_premium_call(lead_phone, message)
-        # update DB reminder as sent
+        # record the call; the reminder is marked sent by the status webhook (or now, if no callback is configured)
         from .db import SessionLocal, Reminder
+        from .calls_api import record_placed_call
         s = SessionLocal()
         r = s.query(Reminder).filter(Reminder.id == reminder_id).first()
         if r:
-            r.sent = True
+            record_placed_call(s, sid, r, lead_phone)
             s.commit()
         s.close()
         print("Call placed:", sid)
@@ -1,5 +1,5 @@
 import os
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, BackgroundTasks, Header
 from pydantic import BaseModel
 from datetime import datetime
 from .db import init_db
@@ -11,11 +11,19 @@ from dotenv import load_dotenv
 load_dotenv()
 from datetime import datetime
 from .reminders_api import router as reminders_router
+from .calls_api import router as calls_router
+from .dialer import router as dialer_router, dialer
+from .dashboard_api import router as dashboard_router
+from . import providers, calls_api, archive, profiling, idempotency
+from .db import engine
 
 init_db()
 app = FastAPI(title="InsureAI Desk - CrewAI Orchestrator")
 app.include_router(leads_router)
 app.include_router(reminders_router)
+app.include_router(calls_router)
+app.include_router(dialer_router)
+app.include_router(dashboard_router)
 
 # existing /crew/schedule_reminder endpoint...
 # (keep your endpoint that triggers SchedulerAgent; unchanged)
@@ -36,10 +44,47 @@ app.add_middleware(
   allow_headers=["*"],
 )
 
+# opt-in: does nothing unless PROFILE_TOKEN or PROFILE_SAMPLE_RATE is set
+profiling.install(app, engine)
+
+@app.on_event("startup")
+def report_providers():
+    # SDKs are imported lazily, so make a missing or unconfigured provider visible in the boot log
+    for name, state in providers.status().items():
+        print(f"provider {name}: {state}")
+
+@app.on_event("startup")
+async def start_dialer():
+    await dialer.start()
+
+@app.on_event("shutdown")
+async def stop_dialer():
+    await dialer.stop()
+
+@app.on_event("startup")
+def start_call_status_flusher():
+    calls_api.start_flusher()
+
+@app.on_event("shutdown")
+async def stop_call_status_flusher():
+    await calls_api.stop_flusher()
+
+@app.on_event("startup")
+def start_reminder_archiver():
+    archive.start_archiver()
+
+@app.on_event("shutdown")
+async def stop_reminder_archiver():
+    await archive.stop_archiver()
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/health/providers")
+def health_providers():
+    return providers.status()
+
 
 
 
@@ -51,11 +96,16 @@ class ScheduleReq(BaseModel):
     prefer_tts: str = "polly"
 
 @app.post("/crew/schedule_reminder")
-async def crew_schedule(req: ScheduleReq, background_tasks: BackgroundTasks):
+async def crew_schedule(req: ScheduleReq, background_tasks: BackgroundTasks, idempotency_key: str = Header(None)):
     payload = req.dict()
     def run_job():
         agent = SchedulerAgent()
         res = agent.run(payload['lead_id'], datetime.fromisoformat(payload['due_date']) if isinstance(payload['due_date'], str) else payload['due_date'], payload.get('days_before',3), payload.get('custom_message'), payload.get('prefer_tts','polly'))
         print('SchedulerAgent result:', res)
-    background_tasks.add_task(run_job)
-    return {"status":"scheduled_in_crew","lead_id": req.lead_id}
+    async def schedule():
+        background_tasks.add_task(run_job)
+        return {"status":"scheduled_in_crew","lead_id": req.lead_id}
+    if not idempotency_key:
+        return await schedule()
+    # a replayed request returns the stored response and queues no job
+    return await idempotency.run_async("crew.schedule_reminder", idempotency_key, idempotency.fingerprint(payload), schedule)
@@ -0,0 +1,253 @@
+# app/profiling.py
+"""
+Opt-in per-request profiling.
+
+Enabled only when PROFILE_TOKEN or PROFILE_SAMPLE_RATE is set; otherwise
+install() adds nothing (no middleware, no SQLAlchemy listeners, no routes).
+
+A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>` or falls
+into the sample rate. While it runs (including its background tasks) a
+sampler thread snapshots the stacks of the threads working on it every
+PROFILE_INTERVAL_MS and counts them in collapsed ("folded") form, which
+flamegraph.pl / speedscope read directly. SQL statements and their times
+are captured from engine events. Reports go to PROFILE_DIR; with
+PROFILE_TOKEN set they are also served (same header) under /debug/profiles.
+With only PROFILE_SAMPLE_RATE set the routes are not installed and the
+reports are read from PROFILE_DIR directly.
+
+Threads are attributed to a request when it starts (the event-loop thread)
+or when they run SQL for it (threadpool workers: sync endpoints and
+background tasks). With concurrent requests, the event loop and a reused
+worker thread can also show other requests' frames, so profile on a quiet
+instance or at a low sample rate.
+"""
+import contextvars, hmac, json, os, random, re, sys, threading, time, uuid
+from collections import Counter
+from datetime import datetime
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+PROFILE_MAX_SQL = 1000
+
+router = APIRouter(prefix="/debug/profiles")
+
+_current = contextvars.ContextVar("profile_session", default=None)
+
+
+def enabled() -> bool:
+    return bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+def _idle(frame) -> bool:
+    """An event loop waiting in select() or a pool thread waiting for work is not part of the request."""
+    for _ in range(3):
+        if frame is None:
+            break
+        key = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+        if key in (("selectors.py", "select"), ("queue.py", "get")):
+            return True
+        frame = frame.f_back
+    return False
+
+
+class ProfileSession:
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = datetime.utcnow().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        self.method, self.path, self.reason = method, path, reason
+        self.threads = set()
+        self.stacks = Counter()
+        self.samples = 0
+        self.sql = []
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.status = None
+        self._stop = threading.Event()
+        self._sampler = None
+        self._t0 = self._t1 = None
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        self.threads.add(threading.get_ident())
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._t1 = time.perf_counter()
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self):
+        interval = PROFILE_INTERVAL_MS / 1000.0
+        me = threading.get_ident()
+        while not self._stop.wait(interval):
+            frames = sys._current_frames()
+            for tid in list(self.threads):
+                f = frames.get(tid)
+                if f is None or tid == me:
+                    continue
+                if _idle(f):
+                    continue
+                stack = []
+                while f is not None:
+                    code = f.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{f.f_lineno})")
+                    f = f.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def add_sql(self, statement: str, seconds: float):
+        self.sql_count += 1
+        self.sql_time += seconds
+        if len(self.sql) < PROFILE_MAX_SQL:
+            self.sql.append({"sql": " ".join(statement.split()), "ms": round(seconds * 1000.0, 3)})
+
+    def report(self) -> dict:
+        return {
+            "id": self.id, "method": self.method, "path": self.path, "reason": self.reason, "status": self.status,
+            "duration_ms": round((self._t1 - self._t0) * 1000.0, 3), "samples": self.samples,
+            "interval_ms": PROFILE_INTERVAL_MS, "threads": len(self.threads),
+            "sql_count": self.sql_count, "sql_ms": round(self.sql_time * 1000.0, 3), "sql": self.sql,
+        }
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+# -------------------------
+# Storage
+# -------------------------
+_ID_RE = re.compile(r"^[0-9T]+-[0-9a-f]{8}$")
+
+
+def save(session: ProfileSession):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, session.id + ".json"), "w") as f:
+        json.dump(session.report(), f, indent=1)
+    with open(os.path.join(PROFILE_DIR, session.id + ".folded"), "w") as f:
+        f.write(session.folded())
+    reports = sorted(n for n in os.listdir(PROFILE_DIR) if n.endswith(".json"))
+    for name in reports[:-PROFILE_KEEP] if len(reports) > PROFILE_KEEP else []:
+        for ext in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name[:-5] + ext))
+            except OSError:
+                pass
+
+
+def _path(profile_id: str, ext: str) -> str:
+    if not _ID_RE.match(profile_id):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    p = os.path.join(PROFILE_DIR, profile_id + ext)
+    if not os.path.exists(p):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return p
+
+
+def _authorize(token: str):
+    if not PROFILE_TOKEN or not token or not hmac.compare_digest(token, PROFILE_TOKEN):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+
+
+@router.get("/")
+def list_profiles(limit: int = 50, x_profile: str = Header(None)):
+    _authorize(x_profile)
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    out = []
+    for name in sorted((n for n in os.listdir(PROFILE_DIR) if n.endswith(".json")), reverse=True)[:limit]:
+        with open(os.path.join(PROFILE_DIR, name)) as f:
+            r = json.load(f)
+        r.pop("sql", None)
+        out.append(r)
+    return out
+
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str, x_profile: str = Header(None)):
+    _authorize(x_profile)
+    with open(_path(profile_id, ".json")) as f:
+        return json.load(f)
+
+
+@router.get("/{profile_id}/folded", response_class=PlainTextResponse)
+def get_profile_folded(profile_id: str, x_profile: str = Header(None)):
+    _authorize(x_profile)
+    with open(_path(profile_id, ".folded")) as f:
+        return PlainTextResponse(f.read(), headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'})
+
+
+# -------------------------
+# Hooks
+# -------------------------
+class ProfilingMiddleware:
+    """Pure ASGI so the profile also covers background tasks run after the response is sent."""
+    def __init__(self, app):
+        self.app = app
+        self._token = PROFILE_TOKEN.encode() if PROFILE_TOKEN else None
+
+    def _reason(self, scope):
+        if scope["path"].startswith(router.prefix):
+            return None
+        if self._token:
+            for k, v in scope.get("headers", ()):
+                if k == b"x-profile":
+                    return "header" if hmac.compare_digest(v, self._token) else None
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        reason = self._reason(scope) if scope["type"] == "http" else None
+        if reason is None:
+            return await self.app(scope, receive, send)
+        session = ProfileSession(scope.get("method", ""), scope["path"], reason)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                session.status = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", session.id.encode())]}
+            await send(message)
+
+        ctx = _current.set(session)
+        session.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            session.stop()
+            _current.reset(ctx)
+            try:
+                await run_in_threadpool(save, session)
+            except Exception as e:
+                print("could not save profile", session.id, "-", e)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    session = _current.get()
+    if session is not None:
+        session.threads.add(threading.get_ident())
+        conn.info.setdefault("profile_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    session = _current.get()
+    if session is not None and conn.info.get("profile_t0"):
+        session.add_sql(statement, time.perf_counter() - conn.info["profile_t0"].pop())
+
+
+def install(app, engine):
+    """Wire profiling into the app if enabled; a no-op (zero per-request cost) otherwise."""
+    if not enabled():
+        return False
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    app.add_middleware(ProfilingMiddleware)
+    if PROFILE_TOKEN:  # profiles contain SQL and stack frames; never serve them unauthenticated
+        app.include_router(router)
+    return True
@@ -0,0 +1,115 @@
+# app/providers.py
+"""
+Registry for the external provider SDKs (OpenAI, Twilio, Polly, S3, Google TTS).
+
+Nothing heavy is imported here. Each SDK is imported and its client built on
+the first get(), then cached. status() only looks the SDKs up on sys.path and
+checks the env vars, so it is safe to call at startup.
+"""
+import importlib, importlib.util, os, threading
+
+_lock = threading.Lock()
+_clients = {}
+_modules = {}
+_overrides = {}
+
+
+def _aws_kwargs():
+    return dict(region_name=os.getenv("AWS_REGION", "us-east-1"),
+                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"))
+
+
+def _build_openai(mod):
+    mod.api_key = os.getenv("OPENAI_API_KEY")
+    return mod
+
+
+def _build_twilio(mod):
+    sid = os.getenv("TWILIO_ACCOUNT_SID")
+    token = os.getenv("TWILIO_AUTH_TOKEN")
+    if not sid or not token:
+        raise RuntimeError("Twilio credentials missing; set TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN")
+    return mod.Client(sid, token)
+
+
+# name -> (module to import, factory(module) -> client, env vars the provider needs)
+PROVIDERS = {
+    "openai": ("openai", _build_openai, ["OPENAI_API_KEY"]),
+    "twilio": ("twilio.rest", _build_twilio, ["TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_PHONE_NUMBER"]),
+    "polly": ("boto3", lambda mod: mod.client("polly", **_aws_kwargs()), ["AWS_S3_BUCKET"]),
+    "s3": ("boto3", lambda mod: mod.client("s3", **_aws_kwargs()), ["AWS_S3_BUCKET"]),
+    "gcloud_tts": ("google.cloud.texttospeech", lambda mod: mod.TextToSpeechClient(), ["AWS_S3_BUCKET"]),
+}
+
+
+def module(name: str):
+    """Import (once) and return the SDK module behind a provider."""
+    if name in _overrides and _overrides[name][1] is not None:
+        return _overrides[name][1]
+    mod = _modules.get(name)
+    if mod is None:
+        with _lock:
+            mod = _modules.get(name)
+            if mod is None:
+                mod = importlib.import_module(PROVIDERS[name][0])
+                _modules[name] = mod
+    return mod
+
+
+def get(name: str):
+    """Return the cached client for a provider, building it on first use."""
+    if name in _overrides and _overrides[name][0] is not None:
+        return _overrides[name][0]
+    client = _clients.get(name)
+    if client is None:
+        mod = module(name)
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = PROVIDERS[name][1](mod)
+                _clients[name] = client
+    return client
+
+
+def _sdk_installed(module_name: str) -> bool:
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def available(name: str) -> bool:
+    """True if the provider is overridden or its SDK is installed (does not import it)."""
+    if name in _overrides:
+        return True
+    return name in _modules or _sdk_installed(PROVIDERS[name][0])
+
+
+def status() -> dict:
+    """Per provider: 'ready', 'sdk missing: <module>' or 'not configured: <ENV,...>'."""
+    out = {}
+    for name, (module_name, _, env) in PROVIDERS.items():
+        if name in _overrides:
+            out[name] = "ready (override)"
+        elif not available(name):
+            out[name] = f"sdk missing: {module_name}"
+        else:
+            missing = [e for e in env if not os.getenv(e)]
+            out[name] = f"not configured: {','.join(missing)}" if missing else "ready"
+    return out
+
+
+def override(name: str, client=None, mod=None):
+    """Swap in a stand-in client and/or module (benchmarks, local fakes)."""
+    _overrides[name] = (client, mod)
+
+
+def reset(name: str = None):
+    """Drop cached clients and overrides (all, or for one provider)."""
+    with _lock:
+        for d in (_clients, _overrides):
+            if name is None:
+                d.clear()
+            else:
+                d.pop(name, None)
@@ -1,8 +1,10 @@
 # app/reminders_api.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import List
 from .db import SessionLocal, Reminder
+from .archive import reminder_history
+from .http_cache import list_etag, not_modified, not_modified_response, set_cache_headers
 from datetime import datetime
 
 router = APIRouter(prefix="/reminders")
@@ -13,13 +15,35 @@ class ReminderUpdate(BaseModel):
     sent: bool = None
 
 @router.get("/", response_model=List[dict])
-def list_reminders(skip: int = 0, limit: int = 100):
+def list_reminders(request: Request, response: Response, skip: int = 0, limit: int = 100):
     db = SessionLocal()
+    etag = list_etag(db, "reminders", skip=skip, limit=limit)
+    if not_modified(request, etag):
+        db.close()
+        return not_modified_response(etag)
     rems = db.query(Reminder).offset(skip).limit(limit).all()
     out = [{"id": r.id, "lead_id": r.lead_id, "due_date": r.due_date.isoformat(), "message": r.message, "sent": r.sent} for r in rems]
     db.close()
+    set_cache_headers(response, etag)
+    return out
+
+@router.get("/history", response_model=List[dict])
+def list_reminder_history(lead_id: int = None, skip: int = 0, limit: int = 100):
+    """Archived (sent or expired) reminders; the list endpoint above only covers the hot table."""
+    db = SessionLocal()
+    out = reminder_history(db, lead_id=lead_id, skip=skip, limit=min(limit, 1000))
+    db.close()
     return out
 
+@router.get("/{reminder_id}", response_model=dict)
+def get_reminder(reminder_id: int):
+    db = SessionLocal()
+    r = db.query(Reminder).filter(Reminder.id == reminder_id).first()
+    db.close()
+    if not r:
+        raise HTTPException(status_code=404, detail="Reminder not found")
+    return {"id": r.id, "lead_id": r.lead_id, "due_date": r.due_date.isoformat(), "message": r.message, "sent": r.sent}
+
 @router.put("/{reminder_id}", response_model=dict)
 def update_reminder(reminder_id: int, payload: ReminderUpdate):
     db = SessionLocal()
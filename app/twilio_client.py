@@ -1,23 +1,18 @@
 import os
-from twilio.rest import Client
-from twilio.twiml.voice_response import VoiceResponse
 from dotenv import load_dotenv
+from . import providers
 load_dotenv()  
 
 TW_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TW_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TW_FROM = os.getenv("TWILIO_PHONE_NUMBER")
 
-client = Client(TW_SID, TW_TOKEN)
-
 def _get_twilio_client():
-    sid = os.getenv("TWILIO_ACCOUNT_SID")
-    token = os.getenv("TWILIO_AUTH_TOKEN")
-    if not sid or not token:
-        raise RuntimeError("Twilio credentials missing; set TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN")
-    return Client(sid, token)
+    # built once on first call by app.providers; raises RuntimeError if credentials are missing
+    return providers.get("twilio")
 
-def place_tts_call(to_phone, message=None, play_url=None, voice="Polly.Joanna"):
+def place_tts_call(to_phone, message=None, play_url=None, voice="Polly.Joanna", status_callback=None, from_number=None):
+    from twilio.twiml.voice_response import VoiceResponse
     client = _get_twilio_client()
     vr = VoiceResponse()
     if play_url:
@@ -26,5 +21,9 @@ def place_tts_call(to_phone, message=None, play_url=None, voice="Polly.Joanna"):
         vr.say(message, voice=voice)
     else:
         raise ValueError("Either message or play_url must be provided")
-    return client.calls.create(to=to_phone, twiml=str(vr), from_=os.getenv("TWILIO_PHONE_NUMBER"))
+    kwargs = {}
+    if status_callback:
+        kwargs = dict(status_callback=status_callback, status_callback_method="POST",
+                      status_callback_event=["initiated", "ringing", "answered", "completed"])
+    return client.calls.create(to=to_phone, twiml=str(vr), from_=from_number or os.getenv("TWILIO_PHONE_NUMBER"), **kwargs)
 
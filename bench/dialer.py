@@ -0,0 +1,218 @@
+# bench/dialer.py
+"""
+Drive app.dialer.Dialer against the fake Twilio API, which enforces a
+per-caller-ID CPS limit (429 above it) and can inject latency and 5xx.
+
+  python -m bench.dialer --calls 500 --numbers 5 --rate 10 --twilio-cps 10
+  python -m bench.dialer --rate 20 --twilio-cps 10      # over-driving: watch throttled_429 / retried
+  python -m bench.dialer --check                        # pass/fail checks of the dialer's guarantees; exit 1 on failure
+"""
+import argparse, asyncio, sys, time
+from datetime import datetime, timedelta, timezone
+
+from .fakes import FaultInjector, FakeTwilioClient
+from .report import environment, write_results
+
+
+# -------------------------
+# Checks
+# -------------------------
+class _ClientError(RuntimeError):
+    status = 400  # e.g. an invalid "to" number: retrying cannot help
+
+
+def _max_in_window(times: list, seconds: float = 1.0) -> int:
+    times, best, lo = sorted(times), 0, 0
+    for hi, t in enumerate(times):
+        while t - times[lo] >= seconds:
+            lo += 1
+        best = max(best, hi - lo + 1)
+    return best
+
+
+async def _drive(dialer, jobs, timeout: float) -> bool:
+    """Submit `jobs`, wait for join(); False if it did not finish within `timeout`."""
+    await dialer.start()
+    try:
+        for job in jobs:
+            dialer.submit(job)
+        await asyncio.wait_for(dialer.join(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        await dialer.stop()
+
+
+async def check_rate(rate: float = 5.0, burst: float = 1.0, numbers: int = 3, per_number: int = 12) -> list:
+    """Each from-number places at most rate + burst calls in any one-second window."""
+    from app.dialer import Dialer, CallJob
+    twilio = FakeTwilioClient(FaultInjector(latency_ms=5))
+    placed = {}
+
+    def place(job, from_number):
+        call = twilio.calls.create(to=job.to, twiml="<Response/>", from_=from_number)
+        placed.setdefault(from_number, []).append(time.monotonic())
+        return call
+
+    d = Dialer(from_numbers=[f"+1555000{i:04d}" for i in range(numbers)], rate=rate, burst=burst, concurrency=8,
+               place=place, record=lambda job, call: None, retry_poll=0)
+    jobs = [CallJob(to=f"+1555{i:07d}", message="rate") for i in range(numbers * per_number)]
+    errors = [] if await _drive(d, jobs, timeout=per_number / rate * 3 + 5) else ["rate: join() timed out"]
+    limit = int(rate + burst)
+    for number, times in sorted(placed.items()):
+        peak = _max_in_window(times)
+        if peak > limit:
+            errors.append(f"rate: {number} placed {peak} calls in one second (limit {limit})")
+    if sum(map(len, placed.values())) != len(jobs):
+        errors.append(f"rate: placed {sum(map(len, placed.values()))}/{len(jobs)}")
+    return errors
+
+
+async def check_retries(calls: int = 20) -> list:
+    """429 and 5xx are retried until the call goes through; other errors fail on the first attempt."""
+    from app.dialer import Dialer, CallJob
+    faults = FaultInjector(failure_rate=0.3, seed=7)         # 503s
+    twilio = FakeTwilioClient(faults, cps_limit=3)           # 429s: the dialer is allowed 50/s
+    attempts = {}
+
+    def place(job, from_number):
+        attempts[job.to] = attempts.get(job.to, 0) + 1
+        if job.to.startswith("+1999"):
+            raise _ClientError(f"invalid number {job.to}")
+        return twilio.calls.create(to=job.to, twiml="<Response/>", from_=from_number)
+
+    d = Dialer(from_numbers=["+15550000001", "+15550000002"], rate=50, burst=5, concurrency=8, max_retries=50,
+               backoff=0.01, backoff_max=0.2, place=place, record=lambda job, call: None, retry_poll=0)
+    good = [CallJob(to=f"+1555{i:07d}", message="retry") for i in range(calls)]
+    bad = [CallJob(to=f"+1999{i:07d}", message="retry") for i in range(3)]
+    errors = [] if await _drive(d, good + bad, timeout=60) else ["retries: join() timed out"]
+    if twilio.calls.rate_limited == 0 or d.throttled == 0:
+        errors.append("retries: fake Twilio never answered 429, so 429 handling was not exercised")
+    if not faults.stats()["failures"].get("twilio"):
+        errors.append("retries: no 5xx was injected, so 5xx handling was not exercised")
+    if d.placed != calls:
+        errors.append(f"retries: placed {d.placed}/{calls} despite only retryable errors")
+    if d.failed != len(bad):
+        errors.append(f"retries: failed {d.failed}, expected {len(bad)} (the non-retryable ones)")
+    retried_bad = [j.to for j in bad if attempts.get(j.to) != 1]
+    if retried_bad:
+        errors.append(f"retries: non-retryable errors were retried for {retried_bad}")
+    return errors
+
+
+async def check_window() -> list:
+    """A job outside its calling window is parked via `defer` (or re-queued in memory), never placed."""
+    from app.dialer import Dialer, CallJob, parse_window
+    now = datetime.now(timezone.utc)
+    closed = parse_window(f"{(now + timedelta(hours=2)):%H:%M}-{(now + timedelta(hours=3)):%H:%M}", "UTC")
+    twilio = FakeTwilioClient(FaultInjector())
+    parked = []
+    place = lambda job, from_number: twilio.calls.create(to=job.to, twiml="<Response/>", from_=from_number)
+    d = Dialer(from_numbers=["+15550000001"], rate=100, burst=10, concurrency=2, place=place,
+               record=lambda job, call: None, defer=lambda job, run_at: parked.append((job.to, run_at)) or True,
+               retry_poll=0)
+    jobs = [CallJob(to="+15550000010", message="window", window=closed),
+            CallJob(to="+15550000011", message="window")]
+    errors = [] if await _drive(d, jobs, timeout=10) else ["window: join() timed out with a parked job"]
+    if [to for to, _ in parked] != ["+15550000010"]:
+        errors.append(f"window: expected only the out-of-hours job to be parked, got {parked}")
+    elif not timedelta(hours=1) < parked[0][1] - datetime.utcnow() <= timedelta(hours=2):
+        errors.append(f"window: parked until {parked[0][1]}, not when the window opens")
+    if len(twilio.calls.placed) != 1:
+        errors.append(f"window: placed {len(twilio.calls.placed)} calls, expected 1 (the in-hours job)")
+
+    # without persistence the job waits in memory: it is deferred, not placed, and still pending
+    d = Dialer(from_numbers=["+15550000001"], rate=100, burst=10, concurrency=1, place=place,
+               record=lambda job, call: None, defer=lambda job, run_at: False, retry_poll=0)
+    await d.start()
+    d.submit(CallJob(to="+15550000012", message="window", window=closed))
+    await asyncio.sleep(0.2)
+    if d.deferred != 1 or d.placed != 0 or d.stats()["pending"] != 1:
+        errors.append(f"window: in-memory deferral went wrong: {d.stats()}")
+    await d.stop()
+    return errors
+
+
+CHECKS = {"rate": check_rate, "retries": check_retries, "window": check_window}
+
+
+async def _check() -> int:
+    failed = 0
+    for name, check in CHECKS.items():
+        t0 = time.perf_counter()
+        errors = await check()
+        failed += bool(errors)
+        print(f"{'FAIL' if errors else 'ok  '} {name:<8} {time.perf_counter() - t0:6.2f} s  {check.__doc__}")
+        for e in errors:
+            print("     ", e)
+    return 1 if failed else 0
+
+
+async def _run(args) -> dict:
+    from app.dialer import Dialer, CallJob, parse_window
+    faults = FaultInjector(args.latency_ms, args.jitter_ms, args.failure_rate, args.seed)
+    twilio = FakeTwilioClient(faults, cps_limit=args.twilio_cps)
+    numbers = [f"+1555000{i:04d}" for i in range(args.numbers)]
+
+    def place(job, from_number):
+        return twilio.calls.create(to=job.to, twiml="<Response/>", from_=from_number)
+
+    d = Dialer(from_numbers=numbers, rate=args.rate, burst=args.burst, concurrency=args.concurrency,
+               max_retries=args.max_retries, backoff=args.backoff, place=place, record=lambda job, call: None,
+               retry_poll=0)
+    await d.start()
+    window = parse_window(args.calling_hours) if args.calling_hours else None
+    t0 = time.perf_counter()
+    for i in range(args.calls):
+        d.submit(CallJob(to=f"+1555{i:07d}", message="Your premium is due soon.", window=window))
+    try:
+        await asyncio.wait_for(d.join(), args.timeout)
+        timed_out = False
+    except asyncio.TimeoutError:
+        timed_out = True
+    wall = time.perf_counter() - t0
+    stats = d.stats()
+    await d.stop()
+    stats.update({"wall_s": round(wall, 3), "timed_out": timed_out,
+                  "expected_max_cps": args.numbers * min(args.rate, args.twilio_cps or args.rate),
+                  "fake_twilio": {"rate_limited": twilio.calls.rate_limited, **faults.stats()}})
+    return stats
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the outbound call dialer against a fake Twilio API")
+    p.add_argument("--calls", type=int, default=500)
+    p.add_argument("--numbers", type=int, default=5, help="size of the from-number pool")
+    p.add_argument("--rate", type=float, default=10.0, help="dialer token-bucket rate per number (calls/s)")
+    p.add_argument("--burst", type=float, default=1.0)
+    p.add_argument("--twilio-cps", type=float, default=10.0, help="fake Twilio per-number CPS limit (0 = unlimited)")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--max-retries", type=int, default=5)
+    p.add_argument("--backoff", type=float, default=0.25)
+    p.add_argument("--latency-ms", type=float, default=80.0, help="fake calls.create latency")
+    p.add_argument("--jitter-ms", type=float, default=40.0)
+    p.add_argument("--failure-rate", type=float, default=0.01, help="fraction of calls.create answered with a 5xx")
+    p.add_argument("--calling-hours", default=None, help="e.g. 09:00-20:00 (UTC); default no restriction")
+    p.add_argument("--timeout", type=float, default=600.0)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--output", default=None)
+    p.add_argument("--check", action="store_true", help="run the pass/fail checks instead of the benchmark")
+    args = p.parse_args(argv)
+
+    if args.check:
+        return asyncio.run(_check())
+
+    stats = asyncio.run(_run(args))
+    res = {"environment": environment(), "config": vars(args), "dialer": stats}
+    print(f"placed {stats['placed']}/{args.calls} in {stats['wall_s']} s: {stats['calls_per_sec']} calls/s "
+          f"(ceiling {stats['expected_max_cps']}), failed {stats['failed']}, retried {stats['retried']}, "
+          f"429s {stats['fake_twilio']['rate_limited']}, deferred {stats['deferred_calling_hours']}")
+    print(f"queue latency ms: {stats['queue_latency_ms']}")
+    if args.output:
+        write_results(args.output, res)
+    return 0 if not stats["timed_out"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
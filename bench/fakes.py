@@ -0,0 +1,227 @@
+# bench/fakes.py
+"""
+Local stand-ins for OpenAI, Polly, S3, Google TTS and Twilio.
+
+Every fake goes through a FaultInjector so a benchmark run can add latency
+and random failures to the provider calls without touching the network.
+"""
+import hashlib, io, json, random, threading, time, uuid
+from types import SimpleNamespace
+
+
+class FakeProviderError(RuntimeError):
+    status = 503  # injected failures look like provider 5xx, so callers treat them as retryable
+
+
+class FakeTwilioRateLimit(RuntimeError):
+    status = 429
+
+
+class FaultInjector:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.failures = {}
+
+    def hit(self, provider: str):
+        with self._lock:
+            self.calls[provider] = self.calls.get(provider, 0) + 1
+            delay = self.latency_ms + (self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+            fail = self._rng.random() < self.failure_rate
+            if fail:
+                self.failures[provider] = self.failures.get(provider, 0) + 1
+        if delay:
+            time.sleep(delay / 1000.0)
+        if fail:
+            raise FakeProviderError(f"injected {provider} failure")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": dict(self.calls), "failures": dict(self.failures)}
+
+
+# -------------------------
+# OpenAI (legacy 0.x module API used by app.agents / app.embeddings_rag)
+# -------------------------
+class _FakeChatCompletion:
+    def __init__(self, faults: FaultInjector):
+        self._faults = faults
+
+    def create(self, model=None, messages=None, **kwargs):
+        self._faults.hit("openai.chat")
+        prompt = (messages or [{}])[-1].get("content", "")
+        message = prompt.split("Message:\n", 1)[-1]
+        return {"choices": [{"message": {"content": json.dumps({"ok": True, "message": message})}}]}
+
+
+class _FakeEmbedding:
+    def __init__(self, faults: FaultInjector, dim: int = 8):
+        self._faults = faults
+        self._dim = dim
+
+    def create(self, model=None, input=None, **kwargs):
+        self._faults.hit("openai.embedding")
+        texts = input if isinstance(input, list) else [input]
+        data = []
+        for t in texts:
+            # hash() of a str is salted per process; a digest keeps embeddings identical across runs
+            rng = random.Random(hashlib.sha256(str(t).encode()).digest())
+            data.append({"embedding": [rng.uniform(-1, 1) for _ in range(self._dim)]})
+        return {"data": data}
+
+
+class FakeOpenAI:
+    def __init__(self, faults: FaultInjector):
+        self.api_key = "fake"
+        self.ChatCompletion = _FakeChatCompletion(faults)
+        self.Embedding = _FakeEmbedding(faults)
+
+
+# -------------------------
+# AWS Polly / S3
+# -------------------------
+class FakePollyClient:
+    def __init__(self, faults: FaultInjector):
+        self._faults = faults
+
+    def synthesize_speech(self, Text=None, OutputFormat="mp3", VoiceId=None, **kwargs):
+        self._faults.hit("polly")
+        return {"AudioStream": io.BytesIO(b"ID3" + (Text or "").encode()[:256])}
+
+
+class FakeS3Client:
+    def __init__(self, faults: FaultInjector):
+        self._faults = faults
+        self.objects = {}
+
+    def put_object(self, Bucket=None, Key=None, Body=None, **kwargs):
+        self._faults.hit("s3")
+        self.objects[(Bucket, Key)] = len(Body or b"")
+        return {"ETag": uuid.uuid4().hex}
+
+
+# -------------------------
+# Google Cloud TTS (mirrors the parts of google.cloud.texttospeech we use)
+# -------------------------
+class FakeGoogleTTSClient:
+    def __init__(self, faults: FaultInjector):
+        self._faults = faults
+
+    def synthesize_speech(self, input=None, voice=None, audio_config=None, **kwargs):
+        self._faults.hit("gcloud_tts")
+        return SimpleNamespace(audio_content=b"ID3" + str(getattr(input, "text", "")).encode()[:256])
+
+
+def fake_texttospeech_module(faults: FaultInjector):
+    return SimpleNamespace(
+        TextToSpeechClient=lambda *a, **kw: FakeGoogleTTSClient(faults),
+        SynthesisInput=lambda text=None, **kw: SimpleNamespace(text=text),
+        VoiceSelectionParams=lambda **kw: SimpleNamespace(**kw),
+        AudioConfig=lambda **kw: SimpleNamespace(**kw),
+        AudioEncoding=SimpleNamespace(MP3="MP3"),
+    )
+
+
+# -------------------------
+# Twilio
+# -------------------------
+class _FakeCalls:
+    def __init__(self, faults: FaultInjector, cps_limit: float = None):
+        self._faults = faults
+        self._lock = threading.Lock()
+        self.cps_limit = cps_limit
+        self._recent = {}
+        self.placed = []
+        self.rate_limited = 0
+
+    def _check_rate(self, from_):
+        # sliding one-second window per caller ID, like Twilio's per-number CPS limit
+        if not self.cps_limit:
+            return
+        now = time.monotonic()
+        with self._lock:
+            recent = [t for t in self._recent.get(from_, []) if now - t < 1.0]
+            if len(recent) >= self.cps_limit:
+                self._recent[from_] = recent
+                self.rate_limited += 1
+                raise FakeTwilioRateLimit(f"429 Too Many Requests for {from_}")
+            recent.append(now)
+            self._recent[from_] = recent
+
+    def create(self, to=None, twiml=None, from_=None, **kwargs):
+        self._check_rate(from_)
+        self._faults.hit("twilio")
+        call = SimpleNamespace(sid="CA" + uuid.uuid4().hex, to=to, from_=from_, status="queued")
+        with self._lock:
+            self.placed.append(call.sid)
+        return call
+
+
+class FakeTwilioClient:
+    def __init__(self, faults: FaultInjector, cps_limit: float = None):
+        self.calls = _FakeCalls(faults, cps_limit)
+
+
+# -------------------------
+# Wiring
+# -------------------------
+class FakeProviders:
+    """
+    Register fakes with app.providers so every external provider call hits one.
+    install() is idempotent per instance; uninstall() restores the originals.
+    """
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.faults = FaultInjector(latency_ms, jitter_ms, failure_rate, seed)
+        self.openai = FakeOpenAI(self.faults)
+        self.polly = FakePollyClient(self.faults)
+        self.s3 = FakeS3Client(self.faults)
+        self.twilio = FakeTwilioClient(self.faults)
+        self.texttospeech = fake_texttospeech_module(self.faults)
+        self.available = {}
+        self._saved = []
+        self._installed = False
+
+    def _patch(self, obj, attr, value):
+        self._saved.append((obj, attr, getattr(obj, attr, None)))
+        setattr(obj, attr, value)
+
+    def install(self):
+        if self._installed:
+            return self
+        from app import providers, polly_s3, gcloud_tts
+        self.available = {name: providers.available(name) for name in providers.PROVIDERS}
+        providers.override("openai", client=self.openai)
+        providers.override("twilio", client=self.twilio)
+        providers.override("polly", client=self.polly)
+        providers.override("s3", client=self.s3)
+        providers.override("gcloud_tts", client=self.texttospeech.TextToSpeechClient(), mod=self.texttospeech)
+        for mod in (polly_s3, gcloud_tts):
+            if not mod.S3_BUCKET:
+                self._patch(mod, "S3_BUCKET", "bench-bucket")
+        try:
+            from app import embeddings_rag
+            self._patch(embeddings_rag, "openai", self.openai)
+        except Exception:
+            pass
+        self._installed = True
+        return self
+
+    def uninstall(self):
+        from app import providers
+        while self._saved:
+            obj, attr, value = self._saved.pop()
+            setattr(obj, attr, value)
+        providers.reset()
+        self._installed = False
+
+    def stats(self) -> dict:
+        out = self.faults.stats()
+        out["sdk_installed"] = dict(self.available)
+        out["calls_placed"] = len(self.twilio.calls.placed)
+        out["twilio_rate_limited"] = self.twilio.calls.rate_limited
+        out["s3_objects"] = len(self.s3.objects)
+        return out
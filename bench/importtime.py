@@ -0,0 +1,95 @@
+# bench/importtime.py
+"""
+Cold import-time benchmark for the app entrypoint, based on `python -X importtime`.
+
+  python -m bench.importtime                         # current tree
+  python -m bench.importtime --ref HEAD~1            # same measurement on another git revision
+  python -m bench.importtime --output importtime.json --compare previous.json
+"""
+import argparse, json, os, statistics, subprocess, sys, tarfile, tempfile, io
+
+from .report import environment, write_results
+
+HEAVY = ["openai", "twilio", "boto3", "botocore", "pandas", "google.cloud.texttospeech", "chromadb"]
+
+
+def parse_importtime(stderr: str) -> dict:
+    """module -> (self_us, cumulative_us) from -X importtime output."""
+    out = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+            out[name.strip()] = (int(self_us), int(cum_us))
+        except ValueError:
+            continue
+    return out
+
+
+def measure_once(module: str, cwd: str) -> dict:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def _checkout(ref: str) -> str:
+    """Extract a git revision into a temp dir (no worktree bookkeeping)."""
+    data = subprocess.run(["git", "archive", ref], capture_output=True, check=True).stdout
+    d = tempfile.mkdtemp(prefix="insureai_importtime_")
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        tar.extractall(d)
+    return d
+
+
+def measure(module: str, cwd: str, runs: int, top: int) -> dict:
+    samples = [measure_once(module, cwd) for _ in range(runs)]
+    totals = [s.get(module, (0, 0))[1] for s in samples]
+    last = samples[-1]
+    heaviest = sorted(last.items(), key=lambda kv: kv[1][1], reverse=True)
+    return {
+        "module": module,
+        "runs": runs,
+        "total_ms": {"median": round(statistics.median(totals) / 1000.0, 2), "min": round(min(totals) / 1000.0, 2),
+                     "max": round(max(totals) / 1000.0, 2)},
+        "modules_imported": len(last),
+        "heavy_sdks_loaded": [m for m in HEAVY if m in last],
+        "top_cumulative_ms": [[name, round(cum / 1000.0, 2)] for name, (_, cum) in heaviest[1:top + 1]],
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Measure cold import time of the app")
+    p.add_argument("--module", default="app.main_crewai")
+    p.add_argument("--ref", default=None, help="git revision to measure instead of the working tree")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--top", type=int, default=15)
+    p.add_argument("--output", default=None)
+    p.add_argument("--compare", default=None, help="previous importtime results file")
+    args = p.parse_args(argv)
+
+    cwd = _checkout(args.ref) if args.ref else os.getcwd()
+    res = measure(args.module, cwd, args.runs, args.top)
+    res["ref"] = args.ref or "working tree"
+    res["environment"] = environment()
+
+    print(f"{args.module} ({res['ref']}): median {res['total_ms']['median']} ms over {args.runs} runs, "
+          f"{res['modules_imported']} modules")
+    print(f"heavy SDKs loaded at import: {', '.join(res['heavy_sdks_loaded']) or 'none'}")
+    for name, ms in res["top_cumulative_ms"]:
+        print(f"  {ms:>10} ms  {name}")
+    if args.output:
+        write_results(args.output, res)
+    if args.compare:
+        with open(args.compare) as f:
+            before = json.load(f)["total_ms"]["median"]
+        after = res["total_ms"]["median"]
+        print(f"median {before} ms -> {after} ms ({(after - before) / before * 100.0 if before else 0.0:+.1f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
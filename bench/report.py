@@ -0,0 +1,80 @@
+# bench/report.py
+import json, math, os, platform, sys
+from datetime import datetime, timezone
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(name: str, latencies_s: list, errors: int, wall_s: float, extra: dict = None) -> dict:
+    ms = sorted(x * 1000.0 for x in latencies_s)
+    out = {
+        "scenario": name,
+        "requests": len(ms),
+        "errors": errors,
+        "wall_s": round(wall_s, 4),
+        "throughput_rps": round(len(ms) / wall_s, 2) if wall_s > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ms) / len(ms), 3) if ms else 0.0,
+            "p50": round(percentile(ms, 50), 3),
+            "p90": round(percentile(ms, 90), 3),
+            "p95": round(percentile(ms, 95), 3),
+            "p99": round(percentile(ms, 99), 3),
+            "max": round(ms[-1], 3) if ms else 0.0,
+        },
+    }
+    if extra:
+        out.update(extra)
+    return out
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(path: str, results: dict):
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True, default=str)
+
+
+def compare(previous: dict, current: dict, threshold_pct: float = 10.0) -> list:
+    """
+    Compare two result files scenario by scenario. Returns rows of
+    (scenario, metric, before, after, change_pct, regressed).
+    """
+    before = {s["scenario"]: s for s in previous.get("scenarios", []) if not s.get("skipped")}
+    rows = []
+    for s in current.get("scenarios", []):
+        if s.get("skipped") or s["scenario"] not in before:
+            continue
+        b = before[s["scenario"]]
+        for metric, higher_is_better in (("throughput_rps", True), ("p50", False), ("p95", False), ("p99", False)):
+            old = b[metric] if metric == "throughput_rps" else b["latency_ms"][metric]
+            new = s[metric] if metric == "throughput_rps" else s["latency_ms"][metric]
+            change = ((new - old) / old * 100.0) if old else 0.0
+            regressed = (change < -threshold_pct) if higher_is_better else (change > threshold_pct)
+            rows.append((s["scenario"], metric, old, new, round(change, 1), regressed))
+    return rows
+
+
+def print_table(results: dict):
+    print(f"{'scenario':<22}{'reqs':>7}{'err':>6}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for s in results.get("scenarios", []):
+        if s.get("skipped"):
+            print(f"{s['scenario']:<22}  skipped: {s['skipped']}")
+            continue
+        l = s["latency_ms"]
+        print(f"{s['scenario']:<22}{s['requests']:>7}{s['errors']:>6}{s['throughput_rps']:>10}{l['p50']:>10}{l['p95']:>10}{l['p99']:>10}")
@@ -0,0 +1,277 @@
+# bench/run.py
+"""
+Load-test / benchmark runner for app.main_crewai:app with fake providers.
+
+  python -m bench.run                          # in-process (TestClient)
+  python -m bench.run --mode http              # local uvicorn server on a free port
+  python -m bench.run --mode http --base-url https://staging.example.com
+  python -m bench.run --output bench/results/new.json --compare bench/results/old.json
+
+Results are written as JSON so two runs can be diffed with --compare.
+"""
+import argparse, json, os, random, socket, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from .report import summarize, environment, write_results, compare, print_table
+
+SCENARIOS = ["bulk_upload", "list_leads", "list_reminders", "list_revalidate", "dashboard_summary", "crew_schedule", "status_callback", "ask"]
+BENCH_TWILIO_TOKEN = "bench-twilio-token"
+
+
+class _HttpClient:
+    def __init__(self, base_url: str):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+    def get(self, path, **kw):
+        return self.session.get(self.base_url + path, timeout=60, **kw)
+
+    def post(self, path, **kw):
+        return self.session.post(self.base_url + path, timeout=60, **kw)
+
+    def close(self):
+        self.session.close()
+
+
+def _free_port() -> int:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def _start_server(app):
+    import uvicorn
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    t = threading.Thread(target=server.run, daemon=True)
+    t.start()
+    deadline = time.time() + 15
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    if not server.started:
+        raise RuntimeError("uvicorn did not start")
+    return server, t, f"http://127.0.0.1:{port}"
+
+
+def _drive(client, name: str, calls: list, concurrency: int, ok_status=(200, 204, 304)) -> dict:
+    """Run each (method, path, kwargs) in calls with bounded concurrency."""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def one(call):
+        method, path, kw = call
+        t0 = time.perf_counter()
+        try:
+            resp = getattr(client, method)(path, **kw)
+            failed = resp.status_code not in ok_status
+        except Exception:
+            failed = True
+        dt = time.perf_counter() - t0
+        with lock:
+            latencies.append(dt)
+            if failed:
+                errors[0] += 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, calls))
+    return summarize(name, latencies, errors[0], time.perf_counter() - t0, {"concurrency": concurrency})
+
+
+def _status_callbacks(base_url: str, sids: list, rng) -> list:
+    """Signed Twilio status callbacks: a few progress events then an outcome per SID, shuffled."""
+    from app.calls_api import twilio_signature
+    url = base_url.rstrip("/") + "/twilio/status"
+    calls = []
+    for sid in sids:
+        outcome = rng.choices(["completed", "no-answer", "busy", "failed"], weights=[70, 15, 10, 5])[0]
+        for status in ("initiated", "ringing", "in-progress", outcome):
+            params = [("CallSid", sid), ("CallStatus", status), ("To", "+15550000000"), ("AccountSid", "ACbench")]
+            if status == "completed":
+                params.append(("CallDuration", str(rng.randint(5, 90))))
+            headers = {"X-Twilio-Signature": twilio_signature(BENCH_TWILIO_TOKEN, url, params)}
+            calls.append(("post", "/twilio/status", {"data": dict(params), "headers": headers}))
+    rng.shuffle(calls)
+    return calls
+
+
+def _wait_for_dialer(timeout: float = 120.0):
+    """Block until the app's dialer has placed every queued call."""
+    import asyncio
+    from app.dialer import dialer
+    if dialer.running:
+        asyncio.run_coroutine_threadsafe(asyncio.wait_for(dialer.join(), timeout), dialer._loop).result()
+
+
+def _calls_table_summary() -> dict:
+    from sqlalchemy import func
+    from app.db import SessionLocal, Call
+    db = SessionLocal()
+    try:
+        rows = db.query(Call.status, func.count(Call.id)).group_by(Call.status).all()
+        return {"by_status": {s: c for s, c in rows},
+                "retries_queued": db.query(func.count(Call.id)).filter(Call.retry_at != None).scalar()}
+    finally:
+        db.close()
+
+
+def _mounted_paths(client) -> set:
+    try:
+        return set(client.get("/openapi.json").json().get("paths", {}).keys())
+    except Exception:
+        return set()
+
+
+def run(args) -> dict:
+    from .datagen import SyntheticData, seed_database
+    from .fakes import FakeProviders
+
+    external = bool(args.base_url)
+    providers = None
+    server = server_thread = None
+    if not external:
+        from app.main_crewai import app
+        providers = FakeProviders(args.latency_ms, args.jitter_ms, args.failure_rate, args.seed).install()
+        if args.seed_leads or args.seed_reminders:
+            seed_database(args.seed_leads, args.seed_reminders, seed=args.seed)
+
+    if external:
+        base = args.base_url
+        client = _HttpClient(base)
+    elif args.mode == "http":
+        server, server_thread, base = _start_server(app)
+        client = _HttpClient(base)
+    else:
+        from fastapi.testclient import TestClient
+        base = "http://testserver"
+        client = TestClient(app, base_url=base)
+        client.__enter__()  # runs startup/shutdown handlers (status-callback flusher)
+
+    gen = SyntheticData(args.seed)
+    rng = random.Random(args.seed)
+    paths = _mounted_paths(client)
+    lead_ids = [l["id"] for l in client.get("/leads/", params={"limit": 1000}).json()] or [1]
+    wanted = args.scenarios or SCENARIOS
+    n, c = args.requests, args.concurrency
+    results = []
+
+    for name in wanted:
+        if name == "bulk_upload":
+            route = "/leads/bulk_upload"
+            calls = [("post", route, {"files": {"file": (f"leads_{i}.csv", gen.leads_csv(args.rows), "text/csv")}})
+                     for i in range(max(1, n // 10))]
+        elif name == "list_leads":
+            route = "/leads/"
+            calls = [("get", route, {"params": {"skip": rng.randint(0, max(0, len(lead_ids) - 100)), "limit": 100}}) for _ in range(n)]
+        elif name == "list_reminders":
+            route = "/reminders/"
+            calls = [("get", route, {"params": {"skip": rng.randint(0, max(0, args.seed_reminders - 100)), "limit": 100}}) for _ in range(n)]
+        elif name == "list_revalidate":
+            # an idle dashboard: same page, conditional GET with the ETag it already holds
+            route = "/reminders/"
+            etag = client.get(route, params={"skip": 0, "limit": 100}).headers.get("etag", "")
+            calls = [("get", route, {"params": {"skip": 0, "limit": 100}, "headers": {"If-None-Match": etag}}) for _ in range(n)]
+        elif name == "dashboard_summary":
+            route = "/dashboard/summary"
+            calls = [("get", route, {}) for _ in range(n)]
+        elif name == "crew_schedule":
+            route = "/crew/schedule_reminder"
+            calls = [("post", route, {"json": {"lead_id": rng.choice(lead_ids), "due_date": gen.due_date().isoformat(),
+                                               "days_before": 3, "custom_message": "Your premium is due soon.",
+                                               "prefer_tts": rng.choice(["polly", "gcloud", "say"])}})
+                     for _ in range(max(1, n // 4))]
+        elif name == "status_callback":
+            route = "/twilio/status"
+            if not external:
+                _wait_for_dialer()
+            sids = (providers.twilio.calls.placed if providers else []) + ["CA%032x" % rng.getrandbits(128) for _ in range(n)]
+            calls = _status_callbacks(base, sids, rng)
+        elif name == "ask":
+            route = "/ask"
+            calls = [("post", route, {"json": {"lead_id": rng.choice(lead_ids), "question": q}}) for q in gen.questions(n)]
+        else:
+            results.append({"scenario": name, "skipped": "unknown scenario"})
+            continue
+        if paths and route not in paths:
+            results.append({"scenario": name, "skipped": f"{route} not mounted on this app"})
+            continue
+        extra = {"rows_per_upload": args.rows} if name == "bulk_upload" else None
+        res = _drive(client, name, calls, c)
+        if extra:
+            res.update(extra)
+        results.append(res)
+
+    if not external:
+        from app.dialer import dialer
+        _wait_for_dialer()
+        out_dialer = dialer.stats()
+    if not external and args.mode == "inprocess":
+        client.__exit__(None, None, None)
+    if server:
+        # uvicorn's graceful shutdown lets queued background tasks (crew jobs) finish before provider stats are read
+        server.should_exit = True
+        server_thread.join(timeout=60)
+    out = {
+        "environment": environment(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "output")},
+        "scenarios": results,
+    }
+    if providers:
+        out["providers"] = providers.stats()
+        out["calls_table"] = _calls_table_summary()
+        out["dialer"] = out_dialer
+        providers.uninstall()
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark app.main_crewai with fake providers")
+    p.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    p.add_argument("--base-url", default=None, help="benchmark an already running server instead (no fakes are installed)")
+    p.add_argument("--scenarios", nargs="*", choices=SCENARIOS)
+    p.add_argument("--requests", type=int, default=200, help="requests per list/ask scenario (uploads use 1/10, scheduling 1/4)")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--rows", type=int, default=200, help="rows per bulk upload file")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--seed-leads", type=int, default=1000)
+    p.add_argument("--seed-reminders", type=int, default=5000)
+    p.add_argument("--latency-ms", type=float, default=20.0, help="base latency injected into every provider call")
+    p.add_argument("--jitter-ms", type=float, default=10.0)
+    p.add_argument("--failure-rate", type=float, default=0.0)
+    p.add_argument("--database-url", default=None, help="defaults to a fresh sqlite file in a temp dir")
+    p.add_argument("--output", default="bench_results.json")
+    p.add_argument("--compare", default=None, help="previous results file to compare against")
+    p.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    args = p.parse_args(argv)
+
+    # app.db reads DATABASE_URL at import time, so this has to happen before run() imports the app
+    if not args.base_url:
+        os.environ["TWILIO_AUTH_TOKEN"] = BENCH_TWILIO_TOKEN
+        os.environ["TWILIO_STATUS_CALLBACK_URL"] = ""  # sign callbacks against the request URL
+        # crew calls go through the dialer; don't let production CPS limits or calling hours throttle the benchmark
+        os.environ.setdefault("TWILIO_CALLS_PER_SECOND", "1000")
+        os.environ.setdefault("TWILIO_CALL_BURST", "100")
+        os.environ.setdefault("CALLING_HOURS", "00:00-00:00")
+        os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="insureai_bench_"), "bench.db")
+
+    results = run(args)
+    write_results(args.output, results)
+    print_table(results)
+    print(f"results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        rows = compare(previous, results, args.threshold)
+        regressed = [r for r in rows if r[5]]
+        for scenario, metric, old, new, change, bad in rows:
+            print(f"{scenario:<22}{metric:<16}{old:>10}{new:>10}{change:>8}%{'  REGRESSION' if bad else ''}")
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# bench/summary.py
+"""
+/dashboard/summary response time as the reminders table grows.
+
+  python -m bench.summary --sizes 10000 100000 1000000 --output summary.json
+
+For each size the same database is topped up with seeded reminders (due
+dates spread around today), then we time compute_summary() directly (cold:
+every call runs the SQL), the HTTP endpoint after a write to `calls`
+(uncached: what a dashboard sees while webhook flushes land every second)
+and the HTTP endpoint with nothing written in between (warm: memoised per
+table version). The old client-side path is timed too, up to
+--client-side-max rows: fetch the list, build a DataFrame, re-parse due_date.
+"""
+import argparse, os, sys, tempfile, time
+from datetime import datetime
+
+from .report import summarize, environment, write_results
+
+
+def _time(fn, n: int) -> list:
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark /dashboard/summary against growing reminder tables")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    p.add_argument("--leads", type=int, default=5000)
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--client-side-max", type=int, default=100000, help="largest size to also time the list+DataFrame path for")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--database-url", default=None)
+    p.add_argument("--output", default=None)
+    args = p.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="insureai_summary_"), "bench.db")
+    from fastapi.testclient import TestClient
+    from app.main_crewai import app
+    from app.db import SessionLocal, Reminder, bump_version
+    from app.dashboard_api import compute_summary
+    from .datagen import seed_database
+
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    client = TestClient(app)
+    results, have = [], 0
+    for i, size in enumerate(sorted(args.sizes)):
+        seed_database(args.leads if i == 0 else 0, size - have, seed=args.seed + i, now=now)
+        have = size
+        db = SessionLocal()
+        try:
+            rows = db.query(Reminder).count()
+            cold = _time(lambda: compute_summary(db), args.repeat)
+        finally:
+            db.close()
+
+        def after_write():
+            # stands in for a webhook flush: bumps the calls version so the memo misses
+            w = SessionLocal()
+            try:
+                bump_version(w.connection(), "calls")
+                w.commit()
+            finally:
+                w.close()
+            t0 = time.perf_counter()
+            client.get("/dashboard/summary").raise_for_status()
+            return time.perf_counter() - t0
+        uncached = [after_write() for _ in range(args.repeat)]
+        client.get("/dashboard/summary")
+        warm = _time(lambda: client.get("/dashboard/summary").raise_for_status(), args.repeat)
+        res = {"rows": rows,
+               "cold_sql": summarize("compute_summary", cold, 0, sum(cold)),
+               "endpoint_uncached": summarize("GET /dashboard/summary after a write", uncached, 0, sum(uncached)),
+               "endpoint_warm": summarize("GET /dashboard/summary", warm, 0, sum(warm))}
+        if size <= args.client_side_max:
+            import pandas as pd
+
+            def client_side():
+                df = pd.DataFrame(client.get("/reminders/", params={"limit": size}).json())
+                pd.to_datetime(df["due_date"], format="mixed", errors="coerce")
+            cs = _time(client_side, max(1, args.repeat // 10))
+            res["client_side"] = summarize("list + DataFrame", cs, 0, sum(cs))
+        results.append(res)
+        line = (f"{rows:>10} rows  cold p50 {res['cold_sql']['latency_ms']['p50']:>9} ms"
+                f"  uncached p50 {res['endpoint_uncached']['latency_ms']['p50']:>9} ms"
+                f"  warm p50 {res['endpoint_warm']['latency_ms']['p50']:>7} ms")
+        if "client_side" in res:
+            line += f"  client-side p50 {res['client_side']['latency_ms']['p50']:>9} ms"
+        print(line)
+
+    if args.output:
+        write_results(args.output, {"environment": environment(), "config": vars(args), "sizes": results})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
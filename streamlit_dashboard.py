@@ -4,6 +4,7 @@ import streamlit as st
 import requests
 import datetime
 import io
+import uuid
 import pandas as pd
 from typing import Optional
 
@@ -60,6 +61,49 @@ def parse_iso_to_local_parts(iso_str: str) -> (datetime.date, datetime.time):
         local_dt = py_dt
     return local_dt.date(), local_dt.time().replace(microsecond=0)
 
+# List responses are cached for CACHE_TTL seconds (Streamlit reruns the script on every
+# widget interaction), then revalidated with If-None-Match so an unchanged list costs a 304.
+CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "15"))
+
+@st.cache_resource
+def _etag_store() -> dict:
+    # (url, params) -> (etag, json); shared across reruns and sessions
+    return {}
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def api_get(url: str, params: tuple = ()):
+    store = _etag_store()
+    key = (url, params)
+    headers = {"If-None-Match": store[key][0]} if key in store else {}
+    r = requests.get(url, params=dict(params), headers=headers, timeout=10)
+    if r.status_code == 304 and key in store:
+        return store[key][1]
+    r.raise_for_status()
+    data = r.json()
+    if r.headers.get("ETag"):
+        store[key] = (r.headers["ETag"], data)
+    return data
+
+def invalidate_cache():
+    """Call after any write so the next rerun revalidates instead of waiting out the TTL."""
+    api_get.clear()
+
+def api_post_retrying(url: str, idempotency_key: Optional[str] = None, attempts: int = 3, **kwargs):
+    """
+    POST, retrying timeouts/connection errors. The backend replays the first
+    response for a repeated Idempotency-Key (bulk uploads fall back to the file hash),
+    so a retry never schedules or inserts twice.
+    """
+    headers = dict(kwargs.pop("headers", None) or {})
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+    for attempt in range(attempts):
+        try:
+            return requests.post(url, headers=headers, **kwargs)
+        except (requests.Timeout, requests.ConnectionError):
+            if attempt == attempts - 1:
+                raise
+
 def reorder_lead_columns(df: pd.DataFrame) -> pd.DataFrame:
     # Put id, name, phone, email near the front if they exist
     cols = list(df.columns)
@@ -67,6 +111,26 @@ def reorder_lead_columns(df: pd.DataFrame) -> pd.DataFrame:
     ordered = [c for c in preferred if c in cols] + [c for c in cols if c not in preferred]
     return df[ordered]
 
+# -------------------------
+# Overview: counts come pre-aggregated from the backend (SQL GROUP BY)
+# -------------------------
+st.header("Overview")
+show_raw = st.checkbox("Show raw tables", value=False, help="Raw lists download rows from the backend; the overview does not.")
+try:
+    summary = api_get(f"{API}/dashboard/summary")
+    c1, c2, c3, c4, c5, c6 = st.columns(6)
+    c1.metric("Leads", summary["leads_total"])
+    c2.metric("Reminders sent", summary["reminders"]["sent"])
+    c3.metric("Reminders pending", summary["reminders"]["unsent"])
+    c4.metric("Due today", summary["due"]["today"])
+    c5.metric("Due next 7 days", summary["due"]["next_7_days"])
+    c6.metric(f"Overdue (last {summary['due'].get('overdue_window_days', 30)} days)", summary["due"]["overdue"])
+    if summary["calls_by_day"]:
+        st.caption("Calls by outcome per day")
+        st.bar_chart(pd.DataFrame(summary["calls_by_day"]).set_index("day").fillna(0))
+except Exception as e:
+    st.error(f"Could not fetch summary: {e}")
+
 # -------------------------
 # Left column: Leads & Create Lead
 # -------------------------
@@ -75,20 +139,22 @@ left, right = st.columns([2, 1])
 with left:
     st.header("Leads")
     if st.button("Refresh leads"):
+        invalidate_cache()
         st.rerun()
 
-    try:
-        resp = requests.get(f"{API}/leads", timeout=10)
-        resp.raise_for_status()
-        leads = resp.json()
-        df_leads = pd.DataFrame(leads)
-        if not df_leads.empty:
-            df_leads = reorder_lead_columns(df_leads)
-            st.dataframe(df_leads)
-        else:
-            st.info("No leads found.")
-    except Exception as e:
-        st.error(f"Could not fetch leads: {e}")
+    if show_raw:
+        try:
+            leads = api_get(f"{API}/leads/")
+            df_leads = pd.DataFrame(leads)
+            if not df_leads.empty:
+                df_leads = reorder_lead_columns(df_leads)
+                st.dataframe(df_leads)
+            else:
+                st.info("No leads found.")
+        except Exception as e:
+            st.error(f"Could not fetch leads: {e}")
+    else:
+        st.caption("Tick \"Show raw tables\" above to list leads.")
 
     st.markdown("---")
     st.subheader("Bulk upload leads (CSV / Excel)")
@@ -103,9 +169,10 @@ with left:
             st.dataframe(preview_df.head())
             if st.button("Upload file to backend"):
                 files = {"file": (uploaded.name, uploaded.getvalue())}
-                res = requests.post(f"{API}/leads/bulk_upload", files=files, timeout=30)
+                res = api_post_retrying(f"{API}/leads/bulk_upload", files=files, timeout=30)
                 res.raise_for_status()
                 st.success(res.json())
+                invalidate_cache()
                 st.rerun()
         except Exception as e:
             st.error(f"Error reading file: {e}")
@@ -127,6 +194,7 @@ with right:
                 r.raise_for_status()
                 st.success(r.json())
                 # refresh list so phone (and other fields) appear
+                invalidate_cache()
                 st.rerun()
             except Exception as e:
                 st.error(f"Failed to create lead: {e}")
@@ -139,14 +207,12 @@ st.header("Edit Lead")
 lead_id_to_load = st.number_input("Lead id (to edit)", min_value=1, step=1, value=1, key="lead_edit_id")
 if st.button("Load lead", key="load_lead"):
     try:
-        r = requests.get(f"{API}/leads", timeout=10)
-        r.raise_for_status()
-        j = r.json()
-        match = next((x for x in j if x.get("id") == lead_id_to_load), None)
-        if not match:
-            st.warning("Lead not found in list")
+        r = requests.get(f"{API}/leads/{int(lead_id_to_load)}", timeout=10)
+        if r.status_code == 404:
+            st.warning("Lead not found")
         else:
-            st.session_state["edit_lead"] = match
+            r.raise_for_status()
+            st.session_state["edit_lead"] = r.json()
             st.experimental_set_query_params()  # force redraw
             st.rerun()
     except Exception as e:
@@ -167,6 +233,7 @@ if "edit_lead" in st.session_state:
             st.success(res.json())
             # clear edit state and refresh lists
             st.session_state.pop("edit_lead", None)
+            invalidate_cache()
             st.rerun()
         except Exception as e:
             st.error(f"Failed to save lead: {e}")
@@ -177,21 +244,21 @@ if "edit_lead" in st.session_state:
 st.markdown("---")
 st.header("Reminders (Scheduled Calls)")
 
-try:
-    r = requests.get(f"{API}/reminders", timeout=10)
-    r.raise_for_status()
-    reminders = r.json()
-    df_rem = pd.DataFrame(reminders)
-    if not df_rem.empty:
-        # robust parsing for mixed timestamp formats
-        df_rem["due_date_local"] = pd.to_datetime(df_rem["due_date"], format='mixed', errors='coerce').apply(
-            lambda ts: pd.to_datetime(ts).tz_convert(datetime.datetime.now().astimezone().tzinfo) if pd.notna(ts) and getattr(ts, "tz", None) is not None else pd.to_datetime(ts)
-        ).dt.tz_localize(None)
-        st.dataframe(df_rem)
-    else:
-        st.info("No reminders found.")
-except Exception as e:
-    st.error(f"Could not fetch reminders: {e}")
+if show_raw:
+    try:
+        reminders = api_get(f"{API}/reminders/")
+        df_rem = pd.DataFrame(reminders)
+        if not df_rem.empty:
+            # vectorised: the backend stores UTC, so parse everything as UTC and convert the column once
+            local_tz = datetime.datetime.now().astimezone().tzinfo
+            df_rem["due_date_local"] = pd.to_datetime(df_rem["due_date"], format='mixed', errors='coerce', utc=True).dt.tz_convert(local_tz).dt.tz_localize(None)
+            st.dataframe(df_rem)
+        else:
+            st.info("No reminders found.")
+    except Exception as e:
+        st.error(f"Could not fetch reminders: {e}")
+else:
+    st.caption("Tick \"Show raw tables\" above to list reminders.")
 
 # -------------------------
 # Edit Reminder
@@ -201,13 +268,12 @@ st.subheader("Edit reminder")
 reminder_id = st.number_input("Reminder id (to edit)", min_value=1, step=1, value=1, key="remid")
 if st.button("Load reminder", key="load_rem"):
     try:
-        rr = requests.get(f"{API}/reminders", timeout=10)
-        rr.raise_for_status()
-        match = next((x for x in rr.json() if x.get("id") == reminder_id), None)
-        if not match:
+        rr = requests.get(f"{API}/reminders/{int(reminder_id)}", timeout=10)
+        if rr.status_code == 404:
             st.warning("Reminder not found")
         else:
-            st.session_state["edit_reminder"] = match
+            rr.raise_for_status()
+            st.session_state["edit_reminder"] = rr.json()
             st.rerun()
     except Exception as e:
         st.error(e)
@@ -233,6 +299,7 @@ if "edit_reminder" in st.session_state:
                 res.raise_for_status()
                 st.success(res.json())
                 st.session_state.pop("edit_reminder", None)
+                invalidate_cache()
                 st.rerun()
             except Exception as e:
                 st.error(f"Failed to save reminder: {e}")
@@ -268,10 +335,11 @@ if st.button("Schedule Reminder (Crew)", key="schedule_crew"):
         }
         st.write("Scheduling:", payload)
         try:
-            res = requests.post(f"{API}/crew/schedule_reminder", json=payload, timeout=15)
+            res = api_post_retrying(f"{API}/crew/schedule_reminder", idempotency_key=str(uuid.uuid4()), json=payload, timeout=15)
             res.raise_for_status()
             st.success(res.json())
             # refresh reminders
+            invalidate_cache()
             st.rerun()
         except Exception as e:
             st.error(f"Failed to schedule: {e}")